@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Benchmark installing one small skill out of a large, locally served repo archive."""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+import functools
+import http.server
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTALLER = os.path.join(SCRIPTS_DIR, "install-skill-from-github.py")
+COMMIT = "0123456789abcdef0123456789abcdef01234567"
+REPO = "bench/monorepo"
+SKILL_PATH = "skills/bench-skill"
+_WRITE_CHUNK_SIZE = 1024 * 1024
+
+# Runs the installer with codeload URLs pointed at the local server, then
+# writes the process's VmHWM (kB) and bytes written (wchar) as JSON to the file
+# named by ``argv[1]``. VmHWM is reset by exec, so unlike the child's
+# ru_maxrss it does not include this harness's memory.
+_LAUNCHER = """
+import importlib.util, json, os, sys
+report, base_url, installer = sys.argv[1:4]
+sys.path.insert(0, os.path.dirname(installer))
+spec = importlib.util.spec_from_file_location("install_skill", installer)
+module = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = module
+spec.loader.exec_module(module)
+download = module._download
+module._download = lambda url, dest: download(
+    url.replace("https://codeload.github.com", base_url), dest
+)
+try:
+    code = module.main(sys.argv[4:])
+finally:
+    with open("/proc/self/status") as status:
+        hwm = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+    with open("/proc/self/io") as io:
+        wchar = next(int(line.split()[1]) for line in io if line.startswith("wchar:"))
+    with open(report, "w") as out:
+        json.dump({"rss_kb": hwm, "written": wchar}, out)
+sys.exit(code)
+"""
+
+
+@dataclass
+class Args:
+    size_mb: int = 300
+    assets: int = 30
+    repeat: int = 1
+    json: bool = False
+
+
+def _build_archive(path: str, size_mb: int, assets: int) -> int:
+    """Write a codeload-style zip: one small skill next to ``size_mb`` of incompressible assets."""
+    top_level = f"{REPO.split('/')[1]}-{COMMIT}"
+    asset_bytes = size_mb * 1024 * 1024 // max(1, assets)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zip_file:
+        zip_file.writestr(
+            f"{top_level}/{SKILL_PATH}/SKILL.md",
+            "---\nname: bench-skill\ndescription: Benchmark skill.\n---\n\n# Bench skill\n",
+        )
+        for index in range(assets):
+            with zip_file.open(f"{top_level}/assets/asset-{index:03d}.bin", "w") as member:
+                remaining = asset_bytes
+                while remaining > 0:
+                    chunk = os.urandom(min(_WRITE_CHUNK_SIZE, remaining))
+                    member.write(chunk)
+                    remaining -= len(chunk)
+    return os.path.getsize(path)
+
+
+def _serve(root: str) -> http.server.ThreadingHTTPServer:
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(Handler, directory=root)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _install(work: str, base_url: str, dest: str, extra: list[str]) -> dict:
+    report = os.path.join(work, "report.json")
+    env = {
+        **os.environ,
+        "XDG_CACHE_HOME": os.path.join(work, "cache"),
+        "CODEX_HOME": os.path.join(work, "codex"),
+        "TMPDIR": os.path.join(work, "tmp"),
+    }
+    os.makedirs(env["TMPDIR"], exist_ok=True)
+    argv = [
+        "--repo",
+        REPO,
+        "--ref",
+        COMMIT,
+        "--path",
+        SKILL_PATH,
+        "--method",
+        "download",
+        "--dest",
+        dest,
+        *extra,
+    ]
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _LAUNCHER, report, base_url, INSTALLER, *argv],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"install exited with {result.returncode}: {result.stderr.strip()}")
+    with open(report, encoding="utf-8") as file_handle:
+        measured = json.load(file_handle)
+    return {
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(measured["rss_kb"] / 1024, 1),
+        "written_mb": round(measured["written"] / (1024 * 1024), 1),
+    }
+
+
+def _run(args: Args, work: str, base_url: str) -> dict:
+    """Install the skill uncached, then from an empty and from a warm snapshot cache."""
+    runs = {"no_cache": ["--no-cache"], "cold_cache": [], "warm_cache": []}
+    results = {}
+    shutil.rmtree(os.path.join(work, "cache"), ignore_errors=True)
+    for index, (name, extra) in enumerate(runs.items()):
+        dest = os.path.join(work, f"dest-{index}")
+        try:
+            results[name] = _install(work, base_url, dest, extra)
+        finally:
+            shutil.rmtree(dest, ignore_errors=True)
+    return results
+
+
+def _parse_args(argv: list[str]) -> Args:
+    parser = argparse.ArgumentParser(
+        description="Benchmark install-skill-from-github.py against a locally served large archive."
+    )
+    parser.add_argument(
+        "--size-mb", type=int, default=300, help="Archive payload size in MiB (default: 300)"
+    )
+    parser.add_argument(
+        "--assets", type=int, default=30, help="Number of asset files in the archive (default: 30)"
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario (default: 1)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args(argv, namespace=Args())
+
+
+def main(argv: list[str]) -> int:
+    args = _parse_args(argv)
+    work = tempfile.mkdtemp(prefix="skill-install-bench-")
+    server = None
+    try:
+        served = os.path.join(work, "served", REPO, "zip")
+        os.makedirs(served)
+        archive_bytes = _build_archive(os.path.join(served, COMMIT), args.size_mb, args.assets)
+        server = _serve(os.path.join(work, "served"))
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        results = [_run(args, work, base_url) for _ in range(max(1, args.repeat))]
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(work, ignore_errors=True)
+    summary = {
+        name: {
+            "wall_s": min(run[name]["wall_s"] for run in results),
+            "peak_rss_mb": max(run[name]["peak_rss_mb"] for run in results),
+            "written_mb": max(run[name]["written_mb"] for run in results),
+        }
+        for name in results[0]
+    }
+    if args.json:
+        print(json.dumps({"archive_mb": round(archive_bytes / (1024 * 1024), 1), **summary}, indent=2))
+        return 0
+    print(f"archive {archive_bytes / (1024 * 1024):.1f} MB")
+    for name, result in summary.items():
+        print(
+            f"{name:<11} {result['wall_s']:>7.3f}s {result['peak_rss_mb']:>6.1f} MB peak RSS "
+            f"{result['written_mb']:>8.1f} MB written"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -4,18 +4,38 @@
 from __future__ import annotations
 
 import os
+import shutil
 import urllib.request
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
-def github_request(url: str, user_agent: str) -> bytes:
+
+def _github_urlopen(url: str, user_agent: str, accept: str | None = None):
     headers = {"User-Agent": user_agent}
+    if accept:
+        headers["Accept"] = accept
     token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
     if token:
         headers["Authorization"] = f"token {token}"
     req = urllib.request.Request(url, headers=headers)
-    with urllib.request.urlopen(req) as resp:
+    return urllib.request.urlopen(req)
+
+
+def github_request(url: str, user_agent: str, accept: str | None = None) -> bytes:
+    with _github_urlopen(url, user_agent, accept) as resp:
         return resp.read()
 
 
+def github_download(url: str, user_agent: str, dest_path: str) -> int:
+    """Stream ``url`` to ``dest_path`` in chunks and return the bytes written."""
+    with _github_urlopen(url, user_agent) as resp, open(dest_path, "wb") as file_handle:
+        shutil.copyfileobj(resp, file_handle, DOWNLOAD_CHUNK_SIZE)
+        return file_handle.tell()
+
+
+def github_api_commit_url(repo: str, ref: str) -> str:
+    return f"https://api.github.com/repos/{repo}/commits/{ref}"
+
+
 def github_api_contents_url(repo: str, path: str, ref: str) -> str:
     return f"https://api.github.com/repos/{repo}/contents/{path}?ref={ref}"
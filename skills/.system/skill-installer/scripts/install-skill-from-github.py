@@ -4,18 +4,51 @@
 from __future__ import annotations
 
 import argparse
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+import errno
+import json
 import os
+import posixpath
+import re
 import shutil
+import stat
 import subprocess
 import sys
 import tempfile
+import time
 import urllib.error
 import urllib.parse
 import zipfile
 
-from github_utils import github_request
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+try:
+    import ctypes
+
+    _libc = ctypes.CDLL(None, use_errno=True)
+except (ImportError, OSError, TypeError):  # pragma: no cover - no C library to load on Windows
+    _libc = None
+
+from github_utils import (
+    github_api_commit_url,
+    github_api_contents_url,
+    github_download,
+    github_request,
+)
+from skill_cache import SkillCache
+from skill_lock import LockedSkill, load_lock, lock_path, save_lock, tree_hash
+
 DEFAULT_REF = "main"
+DEFAULT_CONCURRENCY = 4
+# ioctl request that clones a file's extents (reflink) on btrfs, XFS and others.
+FICLONE = 0x40049409
+# renameat2() arguments that swap two paths in a single step (Linux 3.15+).
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
 
 
 @dataclass
@@ -27,6 +60,21 @@ class Args:
     dest: str | None = None
     name: str | None = None
     method: str = "auto"
+    no_cache: bool = False
+    hardlink: bool = False
+    manifest: str | None = None
+    concurrency: int = DEFAULT_CONCURRENCY
+
+
+@dataclass
+class SyncArgs:
+    names: list[str] = field(default_factory=list)
+    dest: str | None = None
+    method: str = "auto"
+    no_cache: bool = False
+    hardlink: bool = False
+    force: bool = False
+    concurrency: int = DEFAULT_CONCURRENCY
 
 
 @dataclass
@@ -38,6 +86,14 @@ class Source:
     repo_url: str | None = None
 
 
+@dataclass
+class ManifestGroup:
+    """Skills from one repo and ref: fetched together, installed as (path, name)."""
+
+    source: Source
+    skills: list[tuple[str, str]] = field(default_factory=list)
+
+
 class InstallError(Exception):
     pass
 
@@ -77,23 +133,116 @@ def _parse_github_url(url: str, default_ref: str) -> tuple[str, str, str, str |
     return owner, repo, ref, subpath or None
 
 
-def _download_repo_zip(owner: str, repo: str, ref: str, dest_dir: str) -> str:
-    zip_url = f"https://codeload.github.com/{owner}/{repo}/zip/{ref}"
+def _path_tree_sha(source: Source, commit: str, path: str) -> str | None:
+    """Return the git tree SHA of ``path`` at ``commit``, or ``None`` when the API cannot tell."""
+    parent, name = posixpath.split(os.path.normpath(path).replace(os.sep, "/"))
+    if name in ("", "."):
+        return None
+    api_url = github_api_contents_url(f"{source.owner}/{source.repo}", parent, commit)
+    try:
+        entries = json.loads(_request(api_url).decode("utf-8"))
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+    if not isinstance(entries, list):
+        return None
+    for entry in entries:
+        if entry.get("name") == name and entry.get("type") == "dir":
+            return entry.get("sha")
+    return None
+
+
+def _resolve_commit(source: Source) -> str | None:
+    """Resolve ``source.ref`` to a commit SHA, or ``None`` when it cannot be resolved."""
+    if re.fullmatch(r"[0-9a-f]{40}", source.ref):
+        return source.ref
+    api_url = github_api_commit_url(f"{source.owner}/{source.repo}", source.ref)
+    try:
+        sha = github_request(api_url, "codex-skill-install", "application/vnd.github.sha")
+        sha = sha.decode("utf-8").strip()
+        if re.fullmatch(r"[0-9a-f]{40}", sha):
+            return sha
+    except (urllib.error.URLError, OSError):
+        pass
+    # The API is rate limited and cannot see private repos without a token;
+    # git may still reach them with the user's credentials.
+    repo_url = source.repo_url or _build_repo_url(source.owner, source.repo)
+    try:
+        result = subprocess.run(
+            ["git", "ls-remote", repo_url, source.ref, f"{source.ref}^{{}}"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+            timeout=60,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    refs = {}
+    for line in result.stdout.splitlines():
+        sha, _, name = line.partition("\t")
+        refs[name] = sha
+    for name in (
+        f"refs/heads/{source.ref}",
+        f"refs/tags/{source.ref}^{{}}",
+        f"refs/tags/{source.ref}",
+    ):
+        if name in refs:
+            return refs[name]
+    return None
+
+
+def _download(url: str, dest_path: str) -> int:
+    return github_download(url, "codex-skill-install", dest_path)
+
+
+def _download_repo_zip(
+    owner: str,
+    repo: str,
+    ref: str,
+    paths: list[str],
+    dest_dir: str,
+    cache: SkillCache | None = None,
+) -> str:
+    """Extract ``paths`` from the repo archive; ``ref`` must be a commit when caching."""
     zip_path = os.path.join(dest_dir, "repo.zip")
+    cached_zip = cache.archive_path(owner, repo, ref) if cache else None
+    if cached_zip and os.path.isfile(cached_zip):
+        zip_path = cached_zip
+    else:
+        zip_url = f"https://codeload.github.com/{owner}/{repo}/zip/{ref}"
+        try:
+            _download(zip_url, zip_path)
+        except urllib.error.HTTPError as exc:
+            raise InstallError(f"Download failed: HTTP {exc.code}") from exc
+    # Only an archive that extracted cleanly is kept, so a truncated or corrupt
+    # download is fetched again next time instead of failing from the cache.
     try:
-        payload = _request(zip_url)
-    except urllib.error.HTTPError as exc:
-        raise InstallError(f"Download failed: HTTP {exc.code}") from exc
-    with open(zip_path, "wb") as file_handle:
-        file_handle.write(payload)
-    with zipfile.ZipFile(zip_path, "r") as zip_file:
-        _safe_extract_zip(zip_file, dest_dir)
-        top_levels = {name.split("/")[0] for name in zip_file.namelist() if name}
-    if not top_levels:
-        raise InstallError("Downloaded archive was empty.")
-    if len(top_levels) != 1:
-        raise InstallError("Unexpected archive layout.")
-    return os.path.join(dest_dir, next(iter(top_levels)))
+        with zipfile.ZipFile(zip_path, "r") as zip_file:
+            top_levels = {name.split("/")[0] for name in zip_file.namelist() if name}
+            if not top_levels:
+                raise InstallError("Downloaded archive was empty.")
+            if len(top_levels) != 1:
+                raise InstallError("Unexpected archive layout.")
+            top_level = next(iter(top_levels))
+            _safe_extract_zip(zip_file, dest_dir, _archive_prefixes(top_level, paths))
+        if cache and zip_path != cached_zip:
+            zip_path = cache.store_archive(owner, repo, ref, zip_path)
+    except zipfile.BadZipFile as exc:
+        if zip_path == cached_zip:
+            os.unlink(cached_zip)
+        raise InstallError(f"Downloaded archive is not a valid zip file: {exc}") from exc
+    finally:
+        if zip_path != cached_zip and os.path.exists(zip_path):
+            os.unlink(zip_path)
+    return os.path.join(dest_dir, top_level)
+
+
+def _archive_prefixes(top_level: str, paths: list[str]) -> list[str]:
+    prefixes = []
+    for path in paths:
+        path = os.path.normpath(path).replace(os.sep, "/")
+        prefixes.append(f"{top_level}/" if path == "." else f"{top_level}/{path}/")
+    return prefixes
 
 
 def _run_git(args: list[str]) -> None:
@@ -102,14 +251,20 @@ def _run_git(args: list[str]) -> None:
         raise InstallError(result.stderr.strip() or "Git command failed.")
 
 
-def _safe_extract_zip(zip_file: zipfile.ZipFile, dest_dir: str) -> None:
+def _safe_extract_zip(
+    zip_file: zipfile.ZipFile, dest_dir: str, prefixes: list[str] | None = None
+) -> None:
+    """Extract the members under ``prefixes`` (all members when ``None``)."""
     dest_root = os.path.realpath(dest_dir)
+    members = []
     for info in zip_file.infolist():
         extracted_path = os.path.realpath(os.path.join(dest_dir, info.filename))
-        if extracted_path == dest_root or extracted_path.startswith(dest_root + os.sep):
-            continue
-        raise InstallError("Archive contains files outside the destination.")
-    zip_file.extractall(dest_dir)
+        if not (extracted_path == dest_root or extracted_path.startswith(dest_root + os.sep)):
+            raise InstallError("Archive contains files outside the destination.")
+        if prefixes is None or info.filename.startswith(tuple(prefixes)):
+            members.append(info)
+    for info in members:
+        zip_file.extract(info, dest_dir)
 
 
 def _validate_relative_path(path: str) -> None:
@@ -161,6 +316,14 @@ def _git_sparse_checkout(repo_url: str, ref: str, paths: list[str], dest_dir: st
     return repo_dir
 
 
+def _skill_name(path: str, name: str | None) -> str:
+    skill_name = name or os.path.basename(path.rstrip("/"))
+    _validate_skill_name(skill_name)
+    if not skill_name:
+        raise InstallError("Unable to derive skill name.")
+    return skill_name
+
+
 def _validate_skill(path: str) -> None:
     if not os.path.isdir(path):
         raise InstallError(f"Skill path not found: {path}")
@@ -169,11 +332,135 @@ def _validate_skill(path: str) -> None:
         raise InstallError("SKILL.md not found in selected skill directory.")
 
 
-def _copy_skill(src: str, dest_dir: str) -> None:
-    os.makedirs(os.path.dirname(dest_dir), exist_ok=True)
+def _clone_file(src: str, dest: str) -> None:
+    """Copy a file by reflink or in-kernel copy when possible, else by reading it."""
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                return
+            except OSError:
+                pass
+        if hasattr(os, "copy_file_range"):
+            try:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                else:
+                    return
+            except OSError:
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst)
+
+
+def _copy_file(src: str, dest: str, hardlink: bool = False) -> str:
+    if hardlink:
+        try:
+            os.link(src, dest)
+        except OSError:
+            pass
+        else:
+            # Linked files share their inode with the source (usually the
+            # snapshot cache); dropping write access keeps in-place edits of an
+            # installed skill from changing the cached copy. The mode is only
+            # changed once the link exists, so a copy made instead keeps the
+            # source's mode.
+            try:
+                os.chmod(dest, os.stat(dest).st_mode & ~0o222)
+                return dest
+            except OSError:
+                os.unlink(dest)
+    _clone_file(src, dest)
+    shutil.copystat(src, dest)
+    # The source may be read-only only because an earlier --hardlink install
+    # linked it; a copy is the user's own file and stays writable.
+    os.chmod(dest, os.stat(dest).st_mode | stat.S_IWUSR)
+    return dest
+
+
+def _copy_tree(src: str, dest: str, hardlink: bool = False) -> None:
+    shutil.copytree(src, dest, copy_function=lambda s, d: _copy_file(s, d, hardlink))
+
+
+def _copy_skill(src: str, dest_dir: str, hardlink: bool = False) -> None:
+    """Copy ``src`` into a sibling temp dir and rename it to ``dest_dir`` once complete."""
+    parent = os.path.dirname(dest_dir)
+    os.makedirs(parent, exist_ok=True)
     if os.path.exists(dest_dir):
         raise InstallError(f"Destination already exists: {dest_dir}")
-    shutil.copytree(src, dest_dir)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(dest_dir)}.", dir=parent)
+    try:
+        staged = os.path.join(staging, "new")
+        _copy_tree(src, staged, hardlink)
+        if os.path.exists(dest_dir):
+            raise InstallError(f"Destination already exists: {dest_dir}")
+        os.rename(staged, dest_dir)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _exchange_paths(first: str, second: str) -> bool:
+    """Swap two paths with renameat2(RENAME_EXCHANGE); ``False`` when that is unsupported."""
+    renameat2 = getattr(_libc, "renameat2", None)
+    if renameat2 is None:
+        return False
+    result = renameat2(
+        AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE
+    )
+    if result == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(err, os.strerror(err), second)
+
+
+def _replace_skill(src: str, dest_dir: str, hardlink: bool = False) -> None:
+    """Swap ``dest_dir`` for a copy of ``src``; the old skill stays until the copy is complete.
+
+    Where renameat2 can exchange the two directories, ``dest_dir`` never goes
+    missing. Otherwise the old skill is renamed aside and put back if the new
+    copy cannot be renamed in, which leaves a short window without it.
+    """
+    parent = os.path.dirname(dest_dir)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(dest_dir)}.", dir=parent)
+    try:
+        staged = os.path.join(staging, "new")
+        _copy_tree(src, staged, hardlink)
+        if _exchange_paths(staged, dest_dir):
+            return
+        old = os.path.join(staging, "old")
+        os.rename(dest_dir, old)
+        try:
+            os.rename(staged, dest_dir)
+        except OSError:
+            os.rename(old, dest_dir)
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _lock_skills(dest_root: str, skills: dict[str, LockedSkill]) -> None:
+    if skills:
+        locked = load_lock(dest_root)
+        locked.update(skills)
+        save_lock(dest_root, locked)
+
+
+def _locked_skill(source: Source, path: str, commit: str | None, dest_dir: str) -> LockedSkill:
+    return LockedSkill(
+        repo=f"{source.owner}/{source.repo}",
+        ref=source.ref,
+        path=path,
+        commit=commit,
+        tree=tree_hash(dest_dir),
+        git_tree=_path_tree_sha(source, commit, path) if commit else None,
+    )
 
 
 def _build_repo_url(owner: str, repo: str) -> str:
@@ -184,10 +471,33 @@ def _build_repo_ssh(owner: str, repo: str) -> str:
     return f"git@github.com:{owner}/{repo}.git"
 
 
-def _prepare_repo(source: Source, method: str, tmp_dir: str) -> str:
+def _git_head(repo_dir: str) -> str:
+    result = subprocess.run(
+        ["git", "-C", repo_dir, "rev-parse", "HEAD"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+def _prepare_repo(
+    source: Source,
+    method: str,
+    tmp_dir: str,
+    cache: SkillCache | None = None,
+    commit: str | None = None,
+) -> str:
     if method in ("download", "auto"):
         try:
-            return _download_repo_zip(source.owner, source.repo, source.ref, tmp_dir)
+            return _download_repo_zip(
+                source.owner,
+                source.repo,
+                commit or source.ref,
+                source.paths,
+                tmp_dir,
+                cache if commit else None,
+            )
         except InstallError as exc:
             if method == "download":
                 raise
@@ -206,6 +516,50 @@ def _prepare_repo(source: Source, method: str, tmp_dir: str) -> str:
     raise InstallError("Unsupported method.")
 
 
+def _fetch_skill_dirs(
+    source: Source,
+    method: str,
+    tmp_dir: str,
+    cache: SkillCache | None,
+    evict: bool = True,
+    commit: str | None = None,
+) -> tuple[str | None, dict[str, str]]:
+    """Return the commit fetched and a map of ``source.paths`` to local directories.
+
+    The ref is resolved to a commit once (unless ``commit`` is given). With a
+    cache, paths already taken from that commit are served from the cache; the
+    rest are fetched (or extracted from the cached archive) and stored in it.
+    The commit is ``None`` when it could not be determined.
+    """
+    commit = commit or _resolve_commit(source)
+    if cache is None or commit is None:
+        repo_root = _prepare_repo(source, method, tmp_dir, commit=commit)
+        if os.path.isdir(os.path.join(repo_root, ".git")):
+            commit = _git_head(repo_root) or None
+        return commit, {path: os.path.join(repo_root, path) for path in source.paths}
+
+    owner, repo = source.owner, source.repo
+    skill_dirs = {path: cache.path_dir(owner, repo, commit, path) for path in source.paths}
+    missing = [path for path in source.paths if not os.path.isdir(skill_dirs[path])]
+    if missing:
+        fetch = Source(owner, repo, source.ref, missing, source.repo_url)
+        repo_root = _prepare_repo(fetch, method, tmp_dir, cache, commit)
+        checked_out = os.path.isdir(os.path.join(repo_root, ".git"))
+        if checked_out and _git_head(repo_root) != commit:
+            # The ref moved since it was resolved; install what was cloned.
+            skill_dirs.update({path: os.path.join(repo_root, path) for path in missing})
+            return None, skill_dirs
+        for path in missing:
+            src = os.path.join(repo_root, path)
+            if os.path.isdir(src):
+                skill_dirs[path] = cache.store_path(owner, repo, commit, path, src)
+            else:
+                skill_dirs[path] = src
+    if evict:
+        cache.evict(keep=(cache.entry_dir(owner, repo, commit),))
+    return commit, skill_dirs
+
+
 def _resolve_source(args: Args) -> Source:
     if args.url:
         owner, repo, ref, url_path = _parse_github_url(args.url, args.ref)
@@ -244,6 +598,323 @@ def _default_dest() -> str:
     return os.path.join(_codex_home(), "skills")
 
 
+def _load_manifest(path: str) -> list[ManifestGroup]:
+    """Read a JSON manifest and group its skills by repo and ref.
+
+    The manifest is ``{"skills": [...]}`` where each entry has ``repo`` (or
+    ``url``), an optional ``ref``, ``path`` or ``paths``, and an optional
+    ``name`` for single-path entries.
+    """
+    try:
+        with open(path, encoding="utf-8") as file_handle:
+            data = json.load(file_handle)
+    except (OSError, ValueError) as exc:
+        raise InstallError(f"Unable to read manifest {path}: {exc}") from exc
+    entries = data.get("skills") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        raise InstallError("Manifest must be an object with a \"skills\" list.")
+    groups: dict[tuple[str, str, str], ManifestGroup] = {}
+    names: set[str] = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise InstallError("Manifest skills must be objects.")
+        paths = entry.get("paths") or ([entry["path"]] if entry.get("path") else None)
+        source = _resolve_source(
+            Args(
+                url=entry.get("url"),
+                repo=entry.get("repo"),
+                path=paths,
+                ref=entry.get("ref") or DEFAULT_REF,
+            )
+        )
+        if entry.get("name") and len(source.paths) != 1:
+            raise InstallError("Manifest \"name\" requires a single path.")
+        key = (source.owner.lower(), source.repo.lower(), source.ref)
+        if key not in groups:
+            groups[key] = ManifestGroup(Source(source.owner, source.repo, source.ref, []))
+        group = groups[key]
+        for skill_path in source.paths:
+            _validate_relative_path(skill_path)
+            skill_name = _skill_name(skill_path, entry.get("name"))
+            if skill_name in names:
+                raise InstallError(f"Skill name listed twice in manifest: {skill_name}")
+            names.add(skill_name)
+            if skill_path not in group.source.paths:
+                group.source.paths.append(skill_path)
+            group.skills.append((skill_path, skill_name))
+    return list(groups.values())
+
+
+def _install_manifest(args: Args) -> int:
+    """Fetch every repo of the manifest once, in parallel, and install all its skills."""
+    started = time.monotonic()
+    groups = _load_manifest(args.manifest)
+    dest_root = args.dest or _default_dest()
+    cache = None if args.no_cache else SkillCache()
+    installed: list[tuple[str, str]] = []
+    skipped: list[str] = []
+    failed: list[str] = []
+    errors: list[str] = []
+    used_entries: list[str] = []
+    locked: dict[str, LockedSkill] = {}
+    tmp_dir = tempfile.mkdtemp(prefix="skill-install-", dir=_tmp_root())
+    try:
+        pending = []
+        for group in groups:
+            todo = []
+            for skill_path, skill_name in group.skills:
+                if os.path.exists(os.path.join(dest_root, skill_name)):
+                    skipped.append(skill_name)
+                else:
+                    todo.append((skill_path, skill_name))
+            if todo:
+                group.skills = todo
+                group.source.paths = list(dict.fromkeys(path for path, _ in todo))
+                pending.append(group)
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+            futures = {
+                pool.submit(
+                    _fetch_skill_dirs,
+                    group.source,
+                    args.method,
+                    tempfile.mkdtemp(dir=tmp_dir),
+                    cache,
+                    False,
+                ): group
+                for group in pending
+            }
+            for future in as_completed(futures):
+                group = futures[future]
+                source = group.source
+                label = f"{source.owner}/{source.repo}@{source.ref}"
+                try:
+                    commit, skill_dirs = future.result()
+                except (InstallError, OSError) as exc:
+                    failed.extend(skill_name for _, skill_name in group.skills)
+                    errors.append(f"{label}: {exc}")
+                    continue
+                for skill_path, skill_name in group.skills:
+                    dest_dir = os.path.join(dest_root, skill_name)
+                    try:
+                        _validate_skill(skill_dirs[skill_path])
+                        _copy_skill(skill_dirs[skill_path], dest_dir, args.hardlink)
+                    except InstallError as exc:
+                        failed.append(skill_name)
+                        errors.append(f"{skill_name} ({label}): {exc}")
+                        continue
+                    installed.append((skill_name, dest_dir))
+                    locked[skill_name] = _locked_skill(source, skill_path, commit, dest_dir)
+                if cache:
+                    used_entries.extend(
+                        os.path.dirname(os.path.dirname(path))
+                        for path in skill_dirs.values()
+                        if path.startswith(cache.root)
+                    )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        _lock_skills(dest_root, locked)
+    if cache:
+        cache.evict(keep=tuple(used_entries))
+    for skill_name, dest_dir in installed:
+        print(f"Installed {skill_name} to {dest_dir}")
+    for skill_name in skipped:
+        print(f"Skipped {skill_name} (already installed)")
+    for message in errors:
+        print(f"Error: {message}", file=sys.stderr)
+    print(
+        f"{len(installed)} installed, {len(skipped)} skipped, {len(failed)} failed "
+        f"from {len(groups)} repo(s) in {time.monotonic() - started:.1f}s"
+    )
+    return 1 if failed else 0
+
+
+def _sync(args: SyncArgs) -> int:
+    """Bring locked skills up to date with their refs, replacing only changed ones.
+
+    Each repo and ref costs one commit lookup; skills whose locked commit is
+    still current are left alone without downloading anything. When the ref
+    has moved, one contents API request per skill compares its git tree SHA,
+    and only repos with a changed (or unknown) tree are downloaded.
+    """
+    started = time.monotonic()
+    dest_root = args.dest or _default_dest()
+    locked = load_lock(dest_root)
+    unknown = [name for name in args.names if name not in locked]
+    if unknown:
+        raise InstallError(f"Not in {lock_path(dest_root)}: {', '.join(unknown)}")
+    groups: dict[tuple[str, str], list[str]] = {}
+    for skill_name in args.names or sorted(locked):
+        entry = locked[skill_name]
+        groups.setdefault((entry.repo, entry.ref), []).append(skill_name)
+
+    def source_for(key: tuple[str, str], paths: list[str]) -> Source:
+        owner, repo = key[0].split("/", 1)
+        return Source(owner=owner, repo=repo, ref=key[1], paths=paths)
+
+    workers = max(1, args.concurrency)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        resolved = pool.map(lambda key: _resolve_commit(source_for(key, [])), groups)
+        commits = dict(zip(groups, resolved))
+
+    current: list[str] = []
+    stale: dict[tuple[str, str], list[str]] = {}
+    for key, names in groups.items():
+        for skill_name in names:
+            entry = locked[skill_name]
+            installed = os.path.isdir(os.path.join(dest_root, skill_name))
+            if installed and commits[key] and entry.commit == commits[key]:
+                current.append(skill_name)
+            else:
+                stale.setdefault(key, []).append(skill_name)
+
+    # A moved ref only costs a download when a skill's files changed: the
+    # contents API reports each path's git tree SHA, which is compared with the
+    # one locked at install.
+    checks = [
+        (key, skill_name)
+        for key, names in stale.items()
+        if commits[key]
+        for skill_name in names
+        if locked[skill_name].git_tree and os.path.isdir(os.path.join(dest_root, skill_name))
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        remote = pool.map(
+            lambda check: _path_tree_sha(
+                source_for(check[0], []), commits[check[0]], locked[check[1]].path
+            ),
+            checks,
+        )
+        remote_trees = {skill_name: sha for (_, skill_name), sha in zip(checks, remote)}
+    for key, skill_name in checks:
+        entry = locked[skill_name]
+        if remote_trees[skill_name] == entry.git_tree:
+            stale[key].remove(skill_name)
+            current.append(skill_name)
+            locked[skill_name] = LockedSkill(
+                entry.repo, entry.ref, entry.path, commits[key], entry.tree, entry.git_tree
+            )
+    stale = {key: names for key, names in stale.items() if names}
+
+    cache = None if args.no_cache else SkillCache()
+    updated: list[str] = []
+    skipped: list[str] = []
+    failed: list[str] = []
+    errors: list[str] = []
+    tmp_dir = tempfile.mkdtemp(prefix="skill-sync-", dir=_tmp_root())
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for key, names in stale.items():
+                paths = list(dict.fromkeys(locked[name].path for name in names))
+                future = pool.submit(
+                    _fetch_skill_dirs,
+                    source_for(key, paths),
+                    args.method,
+                    tempfile.mkdtemp(dir=tmp_dir),
+                    cache,
+                    False,
+                    commits[key],
+                )
+                futures[future] = key
+            for future in as_completed(futures):
+                key = futures[future]
+                label = f"{key[0]}@{key[1]}"
+                try:
+                    commit, skill_dirs = future.result()
+                except (InstallError, OSError) as exc:
+                    failed.extend(stale[key])
+                    errors.append(f"{label}: {exc}")
+                    continue
+                for skill_name in stale[key]:
+                    entry = locked[skill_name]
+                    src = skill_dirs[entry.path]
+                    dest_dir = os.path.join(dest_root, skill_name)
+                    try:
+                        _validate_skill(src)
+                        if not os.path.isdir(dest_dir):
+                            _copy_skill(src, dest_dir, args.hardlink)
+                            changed = True
+                            print(f"Restored {skill_name}")
+                        elif tree_hash(src, follow_symlinks=True) == entry.tree:
+                            # The ref moved but this skill's files did not.
+                            changed = False
+                        elif not args.force and tree_hash(dest_dir) != entry.tree:
+                            skipped.append(skill_name)
+                            continue
+                        else:
+                            _replace_skill(src, dest_dir, args.hardlink)
+                            changed = True
+                            old, new = (entry.commit or "unknown")[:7], (commit or "unknown")[:7]
+                            print(f"Updated {skill_name} ({old} -> {new})")
+                    except (InstallError, OSError) as exc:
+                        failed.append(skill_name)
+                        errors.append(f"{skill_name} ({label}): {exc}")
+                        continue
+                    if changed:
+                        updated.append(skill_name)
+                    else:
+                        current.append(skill_name)
+                    # Hash what was installed, as the install path does: the copy
+                    # can differ from ``src`` (symlinks become regular files).
+                    new_tree = tree_hash(dest_dir) if changed else entry.tree
+                    git_tree = remote_trees.get(skill_name)
+                    if git_tree is None and commit:
+                        git_tree = _path_tree_sha(source_for(key, []), commit, entry.path)
+                    locked[skill_name] = LockedSkill(
+                        entry.repo, entry.ref, entry.path, commit, new_tree, git_tree
+                    )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        save_lock(dest_root, locked)
+    if cache:
+        cache.evict()
+    for skill_name in skipped:
+        print(f"Skipped {skill_name} (modified locally; --force replaces it)")
+    for message in errors:
+        print(f"Error: {message}", file=sys.stderr)
+    print(
+        f"{len(updated)} updated, {len(current)} up to date, {len(skipped)} skipped, "
+        f"{len(failed)} failed in {time.monotonic() - started:.1f}s"
+    )
+    return 1 if failed else 0
+
+
+def _parse_sync_args(argv: list[str]) -> SyncArgs:
+    parser = argparse.ArgumentParser(
+        prog="install-skill-from-github.py sync",
+        description="Update installed skills recorded in the skills lockfile.",
+    )
+    parser.add_argument("names", nargs="*", help="Skills to sync (default: all locked skills)")
+    parser.add_argument("--dest", help="Destination skills directory")
+    parser.add_argument(
+        "--method",
+        choices=["auto", "download", "git"],
+        default="auto",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Fetch the repo again instead of using the local snapshot cache",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="Hard-link files from the snapshot cache instead of copying them (made read-only)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Replace skills even if they were modified since they were installed",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Repos checked and fetched in parallel (default: {DEFAULT_CONCURRENCY})",
+    )
+    return parser.parse_args(argv, namespace=SyncArgs())
+
+
 def _parse_args(argv: list[str]) -> Args:
     parser = argparse.ArgumentParser(description="Install a skill from GitHub.")
     parser.add_argument("--repo", help="owner/repo")
@@ -263,12 +934,40 @@ def _parse_args(argv: list[str]) -> Args:
         choices=["auto", "download", "git"],
         default="auto",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Fetch the repo again instead of using the local snapshot cache",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="Hard-link files from the snapshot cache instead of copying them (made read-only)",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="JSON manifest of skills to install, fetching each repo/ref once",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Repos fetched in parallel with --manifest (default: {DEFAULT_CONCURRENCY})",
+    )
     return parser.parse_args(argv, namespace=Args())
 
 
 def main(argv: list[str]) -> int:
+    if argv[:1] == ["sync"]:
+        try:
+            return _sync(_parse_sync_args(argv[1:]))
+        except InstallError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            return 1
     args = _parse_args(argv)
     try:
+        if args.manifest:
+            return _install_manifest(args)
         source = _resolve_source(args)
         source.ref = source.ref or args.ref
         if not source.paths:
@@ -277,23 +976,23 @@ def main(argv: list[str]) -> int:
             _validate_relative_path(path)
         dest_root = args.dest or _default_dest()
         tmp_dir = tempfile.mkdtemp(prefix="skill-install-", dir=_tmp_root())
+        locked: dict[str, LockedSkill] = {}
         try:
-            repo_root = _prepare_repo(source, args.method, tmp_dir)
+            cache = None if args.no_cache else SkillCache()
+            commit, skill_dirs = _fetch_skill_dirs(source, args.method, tmp_dir, cache)
             installed = []
             for path in source.paths:
-                skill_name = args.name if len(source.paths) == 1 else None
-                skill_name = skill_name or os.path.basename(path.rstrip("/"))
-                _validate_skill_name(skill_name)
-                if not skill_name:
-                    raise InstallError("Unable to derive skill name.")
+                skill_name = _skill_name(path, args.name if len(source.paths) == 1 else None)
                 dest_dir = os.path.join(dest_root, skill_name)
                 if os.path.exists(dest_dir):
                     raise InstallError(f"Destination already exists: {dest_dir}")
-                skill_src = os.path.join(repo_root, path)
+                skill_src = skill_dirs[path]
                 _validate_skill(skill_src)
-                _copy_skill(skill_src, dest_dir)
+                _copy_skill(skill_src, dest_dir, args.hardlink)
                 installed.append((skill_name, dest_dir))
+                locked[skill_name] = _locked_skill(source, path, commit, dest_dir)
         finally:
+            _lock_skills(dest_root, locked)
             if os.path.isdir(tmp_dir):
                 shutil.rmtree(tmp_dir, ignore_errors=True)
         for skill_name, dest_dir in installed:
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Local cache of fetched skill repo snapshots, keyed by owner/repo/commit."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def _default_root() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "codex", "skill-archives")
+
+
+def _subdirs(path: str) -> list[str]:
+    try:
+        return [entry.path for entry in os.scandir(path) if entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class SkillCache:
+    """Size-bounded LRU cache of repo archives and the skill paths taken from them.
+
+    A commit's entry lives in ``<root>/<owner>/<repo>/<commit>/`` and holds the
+    downloaded ``archive.zip`` (when the download method was used) and one
+    ``paths/<digest>/`` directory per repo path installed from it. Commits are
+    immutable, so entries never go stale; using an entry refreshes its mtime and
+    eviction removes the least recently used entries until the cache fits in
+    ``max_bytes``.
+    """
+
+    def __init__(self, root: str | None = None, max_bytes: int | None = None) -> None:
+        self.root = root or _default_root()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("CODEX_SKILL_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, owner: str, repo: str, commit: str) -> str:
+        path = os.path.join(self.root, owner.lower(), repo.lower(), commit)
+        os.makedirs(path, exist_ok=True)
+        os.utime(path)
+        return path
+
+    def archive_path(self, owner: str, repo: str, commit: str) -> str:
+        return os.path.join(self.entry_dir(owner, repo, commit), "archive.zip")
+
+    def path_dir(self, owner: str, repo: str, commit: str, path: str) -> str:
+        normalized = os.path.normpath(path).replace(os.sep, "/")
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.entry_dir(owner, repo, commit), "paths", digest)
+
+    def store_path(self, owner: str, repo: str, commit: str, path: str, src: str) -> str:
+        """Move ``src`` (a checkout of ``path``) into the cache and return its new location.
+
+        The tree is staged next to its final location and renamed into place,
+        so a concurrent or interrupted store never leaves a partial entry.
+        """
+        dest = self.path_dir(owner, repo, commit, path)
+        if os.path.isdir(dest):
+            return dest
+        parent = os.path.dirname(dest)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=parent)
+        try:
+            staged = os.path.join(staging, "tree")
+            shutil.move(src, staged)
+            try:
+                os.rename(staged, dest)
+            except OSError:
+                if not os.path.isdir(dest):
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return dest
+
+    def store_archive(self, owner: str, repo: str, commit: str, src: str) -> str:
+        dest = self.archive_path(owner, repo, commit)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.move(src, tmp_path)
+            os.replace(tmp_path, dest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return dest
+
+    def _entries(self):
+        for owner in _subdirs(self.root):
+            for repo in _subdirs(owner):
+                yield from _subdirs(repo)
+
+    def evict(self, keep: tuple[str, ...] = ()) -> None:
+        """Remove least recently used entries until the cache fits in ``max_bytes``."""
+        entries = []
+        total = 0
+        for path in self._entries():
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+            size = _tree_size(path)
+            entries.append((mtime, size, path))
+            total += size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        keep_paths = {os.path.realpath(path) for path in keep}
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if os.path.realpath(path) in keep_paths:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Lockfile of installed skills: source repo, path, commit and content hash."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+LOCK_FILENAME = ".skills-lock.json"
+LOCK_VERSION = 1
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class LockedSkill:
+    repo: str
+    ref: str
+    path: str
+    commit: str | None
+    tree: str
+    # Git tree SHA of ``path`` at ``commit``, when the GitHub API reported it.
+    git_tree: str | None = None
+
+
+def lock_path(dest_root: str) -> str:
+    return os.path.join(dest_root, LOCK_FILENAME)
+
+
+def load_lock(dest_root: str) -> dict[str, LockedSkill]:
+    try:
+        with open(lock_path(dest_root), encoding="utf-8") as file_handle:
+            data = json.load(file_handle)
+    except FileNotFoundError:
+        return {}
+    return {name: LockedSkill(**entry) for name, entry in data.get("skills", {}).items()}
+
+
+def save_lock(dest_root: str, skills: dict[str, LockedSkill]) -> None:
+    """Write the lockfile through a temp file so readers never see a partial one."""
+    os.makedirs(dest_root, exist_ok=True)
+    payload = {
+        "version": LOCK_VERSION,
+        "skills": {name: asdict(skills[name]) for name in sorted(skills)},
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=dest_root, prefix=f"{LOCK_FILENAME}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file_handle:
+            json.dump(payload, file_handle, indent=2)
+            file_handle.write("\n")
+        os.replace(tmp_path, lock_path(dest_root))
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_handle:
+        for chunk in iter(lambda: file_handle.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_hash(root: str, follow_symlinks: bool = False) -> str:
+    """Hash a directory's file names, contents, symlink targets and executable bits.
+
+    With ``follow_symlinks`` symlinks hash as the files and directories they
+    point to, which is how they look once copied into place.
+    """
+    lines = []
+    for dirpath, dirnames, filenames in os.walk(root, followlinks=follow_symlinks):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            mode = os.stat(path).st_mode if follow_symlinks else os.lstat(path).st_mode
+            if stat.S_ISLNK(mode):
+                lines.append(f"link {hashlib.sha256(os.readlink(path).encode()).hexdigest()} {rel}")
+            else:
+                kind = "exec" if mode & stat.S_IXUSR else "file"
+                lines.append(f"{kind} {_file_digest(path)} {rel}")
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Benchmark the CircleCI scripts against the offline fake API.
+
+Each scenario runs a script as a subprocess pointed at cc_fake_api.py and
+records wall time, the number of API requests it made and its peak RSS, once
+with an empty cache and once with the cache left by the first run.
+
+Peak RSS is the script's own ``VmHWM``. A child's ``ru_maxrss`` starts from the
+high-water mark of the process it was forked from, so it would report this
+harness instead; each script runs under a small launcher that reads
+``/proc/self/status`` once the script has finished.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from cc_fake_api import start_server, synthetic_fixture
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SLUG = "gh/acme/widgets"
+REPO = "acme/widgets"
+BRANCH = "main"
+FAILED_JOB = 20000  # job-0-0 of pipeline 20, failed in the synthetic fixture
+
+SCENARIOS = {
+    "status_branch": ["cc_status_branch.py", REPO, BRANCH, "--host", "{host}"],
+    "wait_branch": ["cc_wait_branch.py", REPO, BRANCH, "1", "--min-interval", "0", "--host", "{host}"],
+    "watch": ["cc_watch.py", f"{REPO}:{BRANCH}", "--rate", "1000", "--host", "{host}"],
+    "job_steps": ["cc_job_steps.py", REPO, str(FAILED_JOB), "--host", "{host}"],
+    "job_failure": ["cc_job_failure.py", REPO, str(FAILED_JOB), "--all", "--host", "{host}"],
+    "job_failure_summary": [
+        "cc_job_failure.py",
+        REPO,
+        str(FAILED_JOB),
+        "--all",
+        "--summary",
+        "--host",
+        "{host}",
+    ],
+    "fetch_output": ["cc_fetch_output.py", "{host}/output/bench/0/0", "--tail", "50"],
+    "status_tree": ["cc_status.py", "--host", "{host}", "tree", SLUG, "--branch", BRANCH],
+    "status_pipelines": ["cc_status.py", "--host", "{host}", "pipelines", SLUG, "--limit", "50"],
+    "report": ["cc_status.py", "--host", "{host}", "report", SLUG, "--limit", "20"],
+    "index": ["cc_status.py", "--host", "{host}", "index", SLUG, "--db", "{tmp}/flaky.sqlite3"],
+}
+
+# Runs ``argv[2]`` as __main__ with the remaining arguments, then writes the
+# process's VmHWM (in kB) to the file named by ``argv[1]``.
+_LAUNCHER = """
+import os, runpy, sys
+report, script = sys.argv[1], os.path.abspath(sys.argv[2])
+sys.argv = sys.argv[2:]
+sys.path[0] = os.path.dirname(script)
+try:
+    runpy.run_path(script, run_name="__main__")
+finally:
+    sys.stdout.flush()
+    with open("/proc/self/status") as status:
+        hwm = next(line.split()[1] for line in status if line.startswith("VmHWM:"))
+    with open(report, "w") as out:
+        out.write(hwm)
+"""
+
+
+def _run(argv: list, env: dict, tmp: str) -> dict:
+    report = os.path.join(tmp, "vmhwm")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", _LAUNCHER, report, *argv],
+        cwd=SCRIPTS_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    wall = time.perf_counter() - started
+    try:
+        with open(report, encoding="utf-8") as file_handle:
+            rss_mb = int(file_handle.read()) / 1024
+        os.unlink(report)
+    except (FileNotFoundError, ValueError):
+        rss_mb = float("nan")
+    return {
+        "wall": wall,
+        "rss_mb": rss_mb,
+        "exit": proc.returncode,
+        "stderr": proc.stderr.decode("utf-8", "replace").strip(),
+    }
+
+
+def _request_count(server) -> int:
+    with server._stats_lock:
+        return server.stats["requests"]
+
+
+def run_scenario(name: str, server, repeat: int) -> dict:
+    """Run one scenario ``repeat`` times cold and warm; report medians."""
+    results: dict = {}
+    for phase in ("cold", "warm"):
+        results[phase] = {"wall": [], "requests": [], "rss_mb": []}
+    for _ in range(repeat):
+        tmp = tempfile.mkdtemp(prefix="cc-bench-")
+        try:
+            env = {
+                **os.environ,
+                "CIRCLECI_CLI_TOKEN": "bench-token",
+                "XDG_CACHE_HOME": tmp,
+                "CIRCLECI_NO_DAEMON": "1",
+            }
+            argv = [arg.format(host=server.url, tmp=tmp) for arg in SCENARIOS[name]]
+            for phase in ("cold", "warm"):
+                before = _request_count(server)
+                run = _run(argv, env, tmp)
+                if run["exit"] != 0:
+                    raise RuntimeError(f"{name} exited with {run['exit']}: {run['stderr']}")
+                results[phase]["wall"].append(run["wall"])
+                results[phase]["requests"].append(_request_count(server) - before)
+                results[phase]["rss_mb"].append(run["rss_mb"])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        phase: {
+            "wall_s": round(statistics.median(values["wall"]), 3),
+            "requests": int(statistics.median(values["requests"])),
+            "peak_rss_mb": round(max(values["rss_mb"]), 1),
+        }
+        for phase, values in results.items()
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the CircleCI scripts offline against cc_fake_api.py."
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        metavar="SCENARIO",
+        help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario (default: 3)")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Seconds of simulated API latency per request (default: 0.05)",
+    )
+    parser.add_argument(
+        "--output-lines",
+        type=int,
+        default=20000,
+        help="Lines per generated step output (default: 20000)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    names = args.scenarios or list(SCENARIOS)
+    server = start_server(
+        synthetic_fixture(SLUG, BRANCH),
+        latency=args.latency,
+        output_lines=args.output_lines,
+    )
+    results = {}
+    try:
+        for name in names:
+            results[name] = run_scenario(name, server, max(1, args.repeat))
+            if not args.json:
+                cold, warm = results[name]["cold"], results[name]["warm"]
+                print(
+                    f"{name:<20} cold {cold['wall_s']:>7.3f}s {cold['requests']:>5} req "
+                    f"{cold['peak_rss_mb']:>6.1f} MB | warm {warm['wall_s']:>7.3f}s "
+                    f"{warm['requests']:>5} req {warm['peak_rss_mb']:>6.1f} MB",
+                    flush=True,
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""On-disk cache for CircleCI resources that never change once a job finishes."""
+
+from __future__ import annotations
+
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Job statuses (API v1.1 and v2) after which a job, its steps and their output
+# are immutable.
+TERMINAL_JOB_STATUSES = {
+    "success",
+    "fixed",
+    "failed",
+    "canceled",
+    "infrastructure_fail",
+    "timedout",
+    "not_run",
+    "no_tests",
+    "retried",
+    "terminated-unknown",
+    "unauthorized",
+}
+
+
+def _default_root() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "agent-dotfiles", "circleci")
+
+
+_VCS_ALIASES = {"github": "gh", "bitbucket": "bb"}
+
+
+def normalize_slug(slug: str) -> str:
+    """Return ``vcs/org/repo`` for ``org/repo``, ``github/org/repo`` or ``gh/org/repo``."""
+    parts = [part for part in slug.strip().split("/") if part]
+    if len(parts) == 2:
+        parts.insert(0, "gh")
+    parts[0] = _VCS_ALIASES.get(parts[0].lower(), parts[0].lower())
+    return "/".join(part.lower() for part in parts)
+
+
+def job_key(host: str, slug: str, job_number: str | int, api: str) -> str:
+    return f"{api}|{host.rstrip('/')}|{normalize_slug(slug)}|{job_number}"
+
+
+def output_key(key: str, step_index: int, action: dict) -> str:
+    return f"{key}|output|{step_index}|{action.get('index', 0)}"
+
+
+def is_terminal(job: dict) -> bool:
+    return job.get("status") in TERMINAL_JOB_STATUSES
+
+
+# Presigned output_urls are only reused from the cache while they stay valid
+# for at least this long.
+OUTPUT_URL_MARGIN = 300
+
+
+def _url_expiry(url: str) -> float:
+    """Return when a presigned URL expires (epoch seconds), or 0 when it does not say."""
+    query = {name.lower(): values[0] for name, values in parse_qs(urlsplit(url).query).items()}
+    try:
+        if "x-amz-date" in query and "x-amz-expires" in query:
+            signed = datetime.strptime(query["x-amz-date"], "%Y%m%dT%H%M%SZ")
+            return signed.replace(tzinfo=timezone.utc).timestamp() + int(query["x-amz-expires"])
+        if "expires" in query:
+            return float(query["expires"])
+    except ValueError:
+        pass
+    return 0.0
+
+
+def output_urls_expired(job: dict) -> bool:
+    """True when an ``output_url`` in v1.1 job details has expired or may expire soon."""
+    deadline = time.time() + OUTPUT_URL_MARGIN
+    return any(
+        _url_expiry(action["output_url"]) < deadline
+        for step in job.get("steps", [])
+        for action in step.get("actions", [])
+        if action.get("output_url")
+    )
+
+
+def get_job_details(cache: ResponseCache, key: str, fetch: Callable[[], dict]) -> tuple[dict, bool]:
+    """Return ``(job, hit)`` like ``get_or_fetch_json``, but never with expired output URLs.
+
+    A finished job's steps never change, but the presigned ``output_url`` values
+    in them do expire, so a cached job whose URLs are no longer valid is fetched
+    again and re-cached.
+    """
+    job, hit = cache.get_or_fetch_json(key, fetch)
+    if hit and output_urls_expired(job):
+        job = fetch()
+        if is_terminal(job):
+            cache.put_json(key, job)
+        hit = False
+    return job, hit
+
+
+class ResponseCache:
+    """Content-addressed, size-bounded LRU cache of gzip-compressed entries.
+
+    Entries are stored as ``<sha256(key)>.gz`` files; a hit refreshes the file's
+    mtime, and eviction removes the least recently used files until the cache
+    fits in ``max_bytes``. A disabled cache misses on every lookup and stores
+    nothing, which is how ``--no-cache`` is implemented.
+    """
+
+    def __init__(
+        self,
+        root: str | None = None,
+        max_bytes: int | None = None,
+        enabled: bool = True,
+    ) -> None:
+        self.root = root or _default_root()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("CIRCLECI_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        # Walking the cache directory costs O(entries), so after the first
+        # write only check the size again once enough new bytes accumulated.
+        self._evict_every = max(1, max_bytes // 64)
+        self._unchecked = self._evict_every
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.gz")
+
+    def _open_hit(self, key: str):
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            handle = gzip.open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return handle
+
+    def contains(self, key: str) -> bool:
+        return self.enabled and os.path.exists(self._path(key))
+
+    def get_json(self, key: str):
+        handle = self._open_hit(key)
+        if handle is None:
+            return None
+        try:
+            with handle:
+                return json.load(handle)
+        except (OSError, EOFError, ValueError):
+            self.discard(key)
+            return None
+
+    def get_or_fetch_json(self, key: str, fetch: Callable[[], object], store_if=is_terminal):
+        """Return ``(payload, hit)``, fetching and storing the payload on a miss.
+
+        Fetched payloads are only stored when ``store_if(payload)`` is true, so
+        jobs that are still running are always re-fetched.
+        """
+        payload = self.get_json(key)
+        if payload is not None:
+            return payload, True
+        payload = fetch()
+        if store_if(payload):
+            self.put_json(key, payload)
+        return payload, False
+
+    def put_json(self, key: str, payload) -> None:
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self._write(key, [gzip.compress(data)])
+
+    def iter_chunks(self, key: str, fetch: Callable[[], Iterable[bytes]]) -> Iterator[bytes]:
+        """Yield cached bytes for ``key``, or stream ``fetch()`` and store it on completion."""
+        handle = self._open_hit(key)
+        if handle is not None:
+            with handle:
+                while True:
+                    chunk = handle.read(CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+        if not self.enabled:
+            yield from fetch()
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        with self._writer(key) as out:
+            for chunk in fetch():
+                out.write(compressor.compress(chunk))
+                yield chunk
+            out.write(compressor.flush())
+            size = out.tell()
+        self._maybe_evict(size)
+
+    def discard(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _write(self, key: str, blobs: Iterable[bytes]) -> None:
+        if self.enabled:
+            with self._writer(key) as out:
+                for blob in blobs:
+                    out.write(blob)
+                size = out.tell()
+            self._maybe_evict(size)
+
+    @contextlib.contextmanager
+    def _writer(self, key: str):
+        """Write an entry to a temp file and rename it into place only on success."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                yield out
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _maybe_evict(self, written: int) -> None:
+        self._unchecked += written
+        if self._unchecked >= self._evict_every:
+            self._unchecked = 0
+            self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(".gz"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
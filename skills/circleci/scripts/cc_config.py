@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""CircleCI token resolution shared by the helper scripts."""
+
+from __future__ import annotations
+
+import functools
+import os
+import re
+
+CLI_CONFIG_PATH = "~/.circleci/cli.yml"
+TOKEN_ENV_VARS = ("CIRCLECI_CLI_TOKEN", "CIRCLECI_TOKEN", "CIRCLE_TOKEN")
+
+
+class ConfigError(RuntimeError):
+    pass
+
+
+@functools.lru_cache(maxsize=4)
+def _read_cli_config(path: str, mtime_ns: int) -> dict[str, str]:
+    """Parse top-level ``key: value`` pairs of the CLI config.
+
+    Memoized on the file's mtime, so a long-running process (such as the query
+    daemon) parses the file once and only again after ``circleci setup``
+    rewrites it.
+    """
+    values: dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as handle:
+        for raw in handle:
+            if raw[:1].isspace():
+                continue
+            line = raw.split("#", 1)[0].strip()
+            match = re.match(r"^([A-Za-z_][\w-]*)\s*:\s*(.+)$", line)
+            if not match:
+                continue
+            value = match.group(2).strip()
+            if len(value) >= 2 and value[0] in "\"'" and value[-1] == value[0]:
+                value = value[1:-1]
+            if value:
+                values[match.group(1)] = value
+    return values
+
+
+def cli_config() -> dict[str, str]:
+    """Return the CircleCI CLI config (empty when ``circleci setup`` never ran)."""
+    path = os.path.expanduser(CLI_CONFIG_PATH)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    return _read_cli_config(path, mtime_ns)
+
+
+def load_token(explicit: str | None = None) -> str:
+    """Resolve the API token: explicit value, then env vars, then ~/.circleci/cli.yml."""
+    if explicit:
+        return explicit
+    for name in TOKEN_ENV_VARS:
+        token = os.environ.get(name)
+        if token:
+            return token
+    token = cli_config().get("token")
+    if token:
+        return token
+    raise ConfigError("Missing CircleCI token. Set CIRCLECI_CLI_TOKEN or run `circleci setup`.")
+
+
+def token_or_exit(explicit: str | None = None) -> str:
+    """``load_token`` for command-line entry points: exit with the message instead of a traceback."""
+    try:
+        return load_token(explicit)
+    except ConfigError as exc:
+        raise SystemExit(str(exc)) from exc
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Long-running local daemon that answers cc_status.py queries over a Unix socket.
+
+The daemon keeps the keep-alive connection pool, the resolved token and the
+parsed CLI config warm between queries. Use cc_query.py as the client; it
+starts the daemon on demand.
+"""
+
+import argparse
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+SOCKET_ENV_VAR = "CIRCLECI_DAEMON_SOCKET"
+DEFAULT_IDLE_TIMEOUT = 900
+# Environment each client sends with its query; the daemon applies it (and the
+# client's cwd) while the query runs instead of using its own.
+FORWARDED_ENV_PREFIXES = ("CIRCLECI_", "CIRCLE_")
+FORWARDED_ENV_VARS = (
+    "HOME",
+    "XDG_CACHE_HOME",
+    "HTTP_PROXY",
+    "HTTPS_PROXY",
+    "NO_PROXY",
+    "http_proxy",
+    "https_proxy",
+    "no_proxy",
+)
+
+
+def private_dir(path: str) -> str:
+    """Create ``path`` as a 0700 directory, or check that an existing one is ours and private.
+
+    The socket must not live where another local user could create it first:
+    clients send queries (and tokens) to whatever listens there.
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by uid {os.getuid()} with mode 0700")
+    return path
+
+
+def is_forwarded(name: str) -> bool:
+    return name in FORWARDED_ENV_VARS or name.startswith(FORWARDED_ENV_PREFIXES)
+
+
+def query_env(environ=None) -> dict[str, str]:
+    environ = os.environ if environ is None else environ
+    return {name: value for name, value in environ.items() if is_forwarded(name)}
+
+
+def owned_by_me(path: str) -> bool:
+    try:
+        return os.stat(path).st_uid == os.getuid()
+    except FileNotFoundError:
+        return False
+
+
+def default_socket_path() -> str:
+    path = os.environ.get(SOCKET_ENV_VAR)
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        directory = os.path.join(runtime_dir, "agent-dotfiles-circleci")
+    else:
+        directory = os.path.join(tempfile.gettempdir(), f"agent-dotfiles-circleci-{os.getuid()}")
+    return os.path.join(private_dir(directory), "daemon.sock")
+
+
+class _FrameWriter(io.TextIOBase):
+    """Text stream that forwards writes to the client as JSON frames."""
+
+    def __init__(self, send, stream: str, buffer_size: int = 8192) -> None:
+        self._send = send
+        self._stream = stream
+        self._buffer_size = buffer_size
+        self._parts: list[str] = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._buffer_size:
+            self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if self._parts:
+            text = "".join(self._parts)
+            self._parts = []
+            self._size = 0
+            self._send({self._stream: text})
+
+    def discard(self) -> None:
+        """Drop later writes, e.g. from worker threads that outlive the query."""
+        self._parts = []
+        self._size = 0
+        self._send = lambda frame: None
+
+
+class _ThreadLocalStream(io.TextIOBase):
+    """sys.stdout/sys.stderr replacement routing each handler thread to its client."""
+
+    def __init__(self, fallback) -> None:
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def bind(self, stream) -> None:
+        self._local.stream = stream
+
+    def bound(self):
+        return getattr(self._local, "stream", None)
+
+    def _target(self):
+        return self.bound() or self._fallback
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+
+def _inherit_streams(*streams: _ThreadLocalStream) -> None:
+    """Bind every new thread to the client streams of the thread that starts it.
+
+    Queries fan out onto worker threads (thread pools, page prefetching), and
+    their stderr notices (retries, the circuit breaker) belong to the client
+    that asked, not to the daemon's own stderr.
+    """
+    start = threading.Thread.start
+
+    def start_bound(thread: threading.Thread) -> None:
+        targets = [stream.bound() for stream in streams]
+        run = thread.run
+
+        def run_bound() -> None:
+            for stream, target in zip(streams, targets):
+                stream.bind(target)
+            run()
+
+        thread.run = run_bound
+        start(thread)
+
+    threading.Thread.start = start_bound
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        self.server.touch()
+        lock = threading.Lock()
+
+        def send(frame: dict) -> None:
+            data = (json.dumps(frame, separators=(",", ":")) + "\n").encode("utf-8")
+            with lock:
+                self.wfile.write(data)
+
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+        except ValueError:
+            send({"stderr": "Invalid request.\n"})
+            send({"exit": 2})
+            return
+        if request.get("command") == "ping":
+            send({"exit": 0})
+            return
+        if request.get("command") == "stop":
+            send({"exit": 0})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+
+        argv = list(request.get("argv", []))
+        cwd = request.get("cwd") or os.getcwd()
+        env = {str(k): str(v) for k, v in (request.get("env") or {}).items() if is_forwarded(str(k))}
+        stdout = _FrameWriter(send, "stdout")
+        stderr = _FrameWriter(send, "stderr")
+        sys.stdout.bind(stdout)
+        sys.stderr.bind(stderr)
+        try:
+            code = self.server.run_status(argv, cwd, env)
+            stderr.flush()
+            stdout.flush()
+            send({"exit": code})
+        except BrokenPipeError:
+            pass
+        finally:
+            sys.stdout.bind(None)
+            sys.stderr.bind(None)
+            stdout.discard()
+            stderr.discard()
+            self.server.touch()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, idle_timeout: float) -> None:
+        self.idle_timeout = idle_timeout
+        self.last_activity = time.monotonic()
+        self.active = 0
+        self._activity_lock = threading.Lock()
+        self._idle = threading.Condition(self._activity_lock)
+        self._context = None
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o600)
+        # Imported once here so every query reuses the warm modules: the shared
+        # connection pool, the memoized token/config and the parser.
+        import cc_status
+
+        self._status = cc_status
+
+    def touch(self) -> None:
+        with self._activity_lock:
+            self.last_activity = time.monotonic()
+
+    def _enter(self, cwd: str, env: dict) -> None:
+        """Wait until no query with a different cwd or environment runs, then apply ours.
+
+        The working directory and ``os.environ`` are process-wide, so queries
+        from clients with the same settings run concurrently and the others
+        wait for them to finish.
+        """
+        context = (cwd, tuple(sorted(env.items())))
+        with self._idle:
+            while self.active and self._context != context:
+                self._idle.wait()
+            if self._context != context:
+                self._context = None
+                for name in [name for name in os.environ if is_forwarded(name)]:
+                    del os.environ[name]
+                os.environ.update(env)
+                os.chdir(cwd)
+                self._context = context
+            self.active += 1
+
+    def run_status(self, argv: list, cwd: str, env: dict) -> int:
+        try:
+            self._enter(cwd, env)
+        except OSError as exc:
+            print(f"Cannot run the query in {cwd}: {exc}", file=sys.stderr)
+            return 1
+        try:
+            return self._status.main(argv)
+        except SystemExit as exc:
+            if exc.code is None or isinstance(exc.code, int):
+                return exc.code or 0
+            print(exc.code, file=sys.stderr)
+            return 1
+        except BrokenPipeError:
+            raise
+        except Exception:
+            traceback.print_exc()
+            return 1
+        finally:
+            with self._idle:
+                self.active -= 1
+                self._idle.notify_all()
+
+    def idle_for(self) -> float:
+        with self._activity_lock:
+            if self.active:
+                return 0.0
+            return time.monotonic() - self.last_activity
+
+
+def _watch_idle(server: DaemonServer) -> None:
+    while True:
+        time.sleep(min(30.0, max(1.0, server.idle_timeout / 10)))
+        if server.idle_for() >= server.idle_timeout:
+            server.shutdown()
+            return
+
+
+def serve(path: str, idle_timeout: float) -> int:
+    if os.path.exists(path):
+        if not owned_by_me(path):
+            print(f"Refusing to replace {path}: it belongs to another user", file=sys.stderr)
+            return 1
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)  # Stale socket from a daemon that died.
+        else:
+            probe.close()
+            print(f"Daemon already running on {path}", file=sys.stderr)
+            return 1
+    old_umask = os.umask(0o177)
+    try:
+        server = DaemonServer(path, idle_timeout)
+    finally:
+        os.umask(old_umask)
+    sys.stdout = _ThreadLocalStream(sys.stdout)
+    sys.stderr = _ThreadLocalStream(sys.stderr)
+    _inherit_streams(sys.stdout, sys.stderr)
+    if idle_timeout > 0:
+        threading.Thread(target=_watch_idle, args=(server,), daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve cc_status.py queries over a Unix socket with warm connections."
+    )
+    parser.add_argument(
+        "--socket",
+        help=f"Unix socket path (default: ${SOCKET_ENV_VAR} or a private per-user directory)",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help=f"Exit after this many idle seconds, 0 to never exit (default: {DEFAULT_IDLE_TIMEOUT})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        path = args.socket or default_socket_path()
+    except PermissionError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    return serve(path, args.idle_timeout)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""Offline stand-in for the CircleCI API that replays recorded payloads.
+
+A fixture is a JSON file ``{"routes": {path: payload}}`` covering API v2 and
+v1.1 paths; ``{host}`` inside payloads is replaced with the server's own URL
+so ``output_url`` values point back at it. Step output under ``/output/`` that
+is not in the fixture is generated on the fly with a configurable size.
+Use ``record`` to capture a fixture from the real API, or ``serve`` without
+``--fixture`` for a synthetic project.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+DEFAULT_PAGE_SIZE = 20
+FAILED_TEST = "tests/test_api.py::test_retry_budget"
+
+
+def _ts(seconds: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(1_700_000_000 + seconds))
+
+
+def synthetic_fixture(
+    slug: str = "gh/acme/widgets",
+    branch: str = "main",
+    pipelines: int = 20,
+    workflows: int = 4,
+    jobs: int = 6,
+) -> dict:
+    """Finished pipelines, newest first; job 0 of workflow 0 fails in even pipelines."""
+    org, repo = slug.split("/")[1:]
+    routes: dict = {}
+    pipeline_items = []
+    for number in range(pipelines, 0, -1):
+        pipeline_id = f"pipeline-{number}"
+        start = number * 3600
+        pipeline_items.append(
+            {
+                "id": pipeline_id,
+                "number": number,
+                "state": "created",
+                "created_at": _ts(start),
+                "vcs": {"branch": branch, "revision": f"{number // 2:040x}"},
+            }
+        )
+        workflow_items = []
+        for w in range(workflows):
+            workflow_id = f"workflow-{number}-{w}"
+            failing = w == 0 and number % 2 == 0
+            job_items = []
+            for j in range(jobs):
+                job_number = number * 1000 + w * 100 + j
+                queued = start + 10 + j * 30
+                started = queued + 3 + j % 4
+                stopped = started + 20 + (job_number * 7) % 90
+                status = "failed" if failing and j == 0 else "success"
+                job_items.append(
+                    {
+                        "id": f"job-{job_number}",
+                        "name": f"job-{w}-{j}",
+                        "type": "build",
+                        "status": status,
+                        "job_number": job_number,
+                        "started_at": _ts(started),
+                        "stopped_at": _ts(stopped),
+                        "dependencies": [f"job-{job_number - 1}"] if j else [],
+                    }
+                )
+                routes[f"/api/v2/project/{slug}/job/{job_number}"] = {
+                    "job_number": job_number,
+                    "name": f"job-{w}-{j}",
+                    "status": status,
+                    "queued_at": _ts(queued),
+                    "started_at": _ts(started),
+                    "stopped_at": _ts(stopped),
+                }
+                routes[f"/api/v1.1/project/github/{org}/{repo}/{job_number}"] = {
+                    "build_num": job_number,
+                    "status": status,
+                    "steps": [
+                        {
+                            "name": name,
+                            "actions": [
+                                {
+                                    "name": name,
+                                    "index": index,
+                                    "status": status if name == "pytest" else "success",
+                                    "output_url": f"{{host}}/output/{job_number}/{step}/{index}",
+                                }
+                                for index in range(2 if name == "pytest" else 1)
+                            ],
+                        }
+                        for step, name in enumerate(("checkout", "install", "pytest"))
+                    ],
+                }
+            routes[f"/api/v2/workflow/{workflow_id}/job"] = {"items": job_items}
+            workflow_items.append(
+                {
+                    "id": workflow_id,
+                    "name": f"workflow-{w}",
+                    "pipeline_id": pipeline_id,
+                    "status": "failed" if failing else "success",
+                    "created_at": _ts(start),
+                    "stopped_at": _ts(start + 10 + jobs * 120),
+                }
+            )
+        routes[f"/api/v2/pipeline/{pipeline_id}/workflow"] = {"items": workflow_items}
+        routes[f"/api/v2/pipeline/{pipeline_id}"] = pipeline_items[-1]
+    routes[f"/api/v2/project/{slug}/pipeline"] = {"items": pipeline_items}
+    return {"routes": routes}
+
+
+def _generated_output(lines: int, line_bytes: int):
+    """Yield a step output JSON array in chunks; it ends in a pytest failure."""
+    filler = "x" * max(0, line_bytes - 16)
+    yield b"["
+    batch = []
+    for number in range(lines):
+        text = f"{number:08d} {filler}\n" if number < lines - 1 else f"FAILED {FAILED_TEST}\n"
+        batch.append(json.dumps({"type": "out", "message": text, "time": _ts(number)}))
+        if len(batch) == 256:
+            yield (",".join(batch) + ",").encode("utf-8")
+            batch = []
+    yield (",".join(batch) + "]").encode("utf-8")
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        fixture: dict,
+        latency: float = 0.0,
+        output_lines: int = 1000,
+        output_line_bytes: int = 80,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> None:
+        super().__init__(address, _Handler)
+        self.routes = fixture.get("routes", {})
+        self.latency = latency
+        self.output_lines = output_lines
+        self.output_line_bytes = output_line_bytes
+        self.page_size = page_size
+        self.stats = {"requests": 0, "connections": 0, "not_modified": 0, "bytes": 0}
+        self._stats_lock = threading.Lock()
+        self._routes_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers=None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count("bytes", len(body))
+
+    def do_GET(self) -> None:
+        server = self.server
+        parts = urlsplit(self.path)
+        if parts.path == "/__stats":
+            with server._stats_lock:
+                body = json.dumps(server.stats).encode("utf-8")
+            self._send(200, body, {"Content-Type": "application/json"})
+            return
+        server.count("requests")
+        if server.latency:
+            time.sleep(server.latency)
+
+        payload = server.routes.get(parts.path)
+        if payload is None and parts.path.startswith("/output/"):
+            self._send_generated_output()
+            return
+        if payload is None:
+            self._send(404, b'{"message":"Not found."}', {"Content-Type": "application/json"})
+            return
+        if isinstance(payload, dict) and isinstance(payload.get("items"), list):
+            payload = self._page(payload, dict(parse_qsl(parts.query)))
+        body = json.dumps(payload, separators=(",", ":")).replace("{host}", server.url)
+        body = body.encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            server.count("not_modified")
+            self._send(304, headers={"ETag": etag})
+            return
+        self._send(200, body, {"Content-Type": "application/json", "ETag": etag})
+
+    def do_POST(self) -> None:
+        """Rerun a workflow: a new, already successful copy joins its pipeline."""
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server.count("requests")
+        path = urlsplit(self.path).path
+        parts = path.strip("/").split("/")
+        if len(parts) != 5 or parts[:3] != ["api", "v2", "workflow"] or parts[4] != "rerun":
+            self._send(404, b'{"message":"Not found."}', {"Content-Type": "application/json"})
+            return
+        workflow_id = parts[3]
+        new_id = None
+        with server._routes_lock:
+            for route, payload in list(server.routes.items()):
+                if not route.endswith("/workflow") or not isinstance(payload, dict):
+                    continue
+                for workflow in payload.get("items", []):
+                    if workflow["id"] == workflow_id:
+                        new_id = f"{workflow_id}-rerun-{len(payload['items'])}"
+                        created_at = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+                        payload["items"].append(
+                            {**workflow, "id": new_id, "status": "success", "created_at": created_at}
+                        )
+                        jobs = server.routes.get(f"/api/v2/workflow/{workflow_id}/job", {"items": []})
+                        server.routes[f"/api/v2/workflow/{new_id}/job"] = {
+                            "items": [{**job, "status": "success"} for job in jobs["items"]]
+                        }
+                        break
+                if new_id:
+                    break
+        if new_id is None:
+            self._send(404, b'{"message":"Workflow not found."}', {"Content-Type": "application/json"})
+            return
+        body = json.dumps({"workflow_id": new_id}).encode("utf-8")
+        self._send(202, body, {"Content-Type": "application/json"})
+
+    def _page(self, payload: dict, query: dict) -> dict:
+        items = payload["items"]
+        offset = int(query.get("page-token") or 0)
+        end = offset + self.server.page_size
+        return {
+            **payload,
+            "items": items[offset:end],
+            "next_page_token": str(end) if end < len(items) else None,
+        }
+
+    def _send_generated_output(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in _generated_output(self.server.output_lines, self.server.output_line_bytes):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.server.count("bytes", len(chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_server(fixture: dict, port: int = 0, **options) -> FakeAPIServer:
+    """Start a server on 127.0.0.1 in a daemon thread and return it."""
+    server = FakeAPIServer(("127.0.0.1", port), fixture, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def record(args: argparse.Namespace) -> int:
+    """Capture finished pipelines of a real project into a replayable fixture."""
+    from cc_config import token_or_exit
+    from cc_http import get_json, iter_items
+
+    token = token_or_exit()
+    host = args.host.rstrip("/")
+    parts = args.project_slug.split("/")
+    if len(parts) != 3 or parts[0] not in ("gh", "github"):
+        raise SystemExit("record supports GitHub project slugs (gh/org/repo) only.")
+    org, repo = parts[1:]
+    routes: dict = {}
+
+    def save(url: str, payload) -> None:
+        routes[url[len(host):].split("?", 1)[0]] = payload
+
+    params = {"branch": args.branch} if args.branch else {}
+    pipelines_url = f"{host}/api/v2/project/{args.project_slug}/pipeline"
+    pipelines = list(iter_items(pipelines_url, token, params=params, limit=args.pipelines))
+    save(pipelines_url, {"items": pipelines})
+    for pipeline in pipelines:
+        workflows_url = f"{host}/api/v2/pipeline/{pipeline['id']}/workflow"
+        workflows = list(iter_items(workflows_url, token))
+        save(f"{host}/api/v2/pipeline/{pipeline['id']}", pipeline)
+        save(workflows_url, {"items": workflows})
+        for workflow in workflows:
+            jobs_url = f"{host}/api/v2/workflow/{workflow['id']}/job"
+            jobs = list(iter_items(jobs_url, token))
+            save(jobs_url, {"items": jobs})
+            for job in jobs:
+                number = job.get("job_number")
+                if number is None:
+                    continue
+                job_url = f"{host}/api/v2/project/{args.project_slug}/job/{number}"
+                save(job_url, get_json(job_url, token))
+                details_url = f"{host}/api/v1.1/project/github/{org}/{repo}/{number}"
+                details = get_json(details_url, token)
+                for step_index, step in enumerate(details.get("steps", [])):
+                    for action in step.get("actions", []):
+                        output_url = action.get("output_url")
+                        if not output_url:
+                            continue
+                        path = f"/output/{number}/{step_index}/{action.get('index', 0)}"
+                        if action.get("status") != "success" or args.all_output:
+                            routes[path] = get_json(output_url)
+                        action["output_url"] = "{host}" + path
+                save(details_url, details)
+        print(f"recorded pipeline {pipeline.get('number')}", file=sys.stderr)
+
+    with open(args.out, "w", encoding="utf-8") as handle:
+        json.dump({"routes": routes}, handle, separators=(",", ":"))
+    print(f"wrote {len(routes)} routes to {args.out}", file=sys.stderr)
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    if args.fixture:
+        with open(args.fixture, encoding="utf-8") as handle:
+            fixture = json.load(handle)
+    else:
+        fixture = synthetic_fixture(pipelines=args.pipelines)
+    server = FakeAPIServer(
+        ("127.0.0.1", args.port),
+        fixture,
+        latency=args.latency,
+        output_lines=args.output_lines,
+        output_line_bytes=args.output_line_bytes,
+        page_size=args.page_size,
+    )
+    print(f"listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay CircleCI API payloads offline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="Serve a fixture (or a synthetic project).")
+    serve_parser.add_argument("--fixture", help="Fixture JSON (default: synthetic gh/acme/widgets)")
+    serve_parser.add_argument("--port", type=int, default=0, help="Port (default: any free port)")
+    serve_parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to every request (default: 0)"
+    )
+    serve_parser.add_argument(
+        "--output-lines",
+        type=int,
+        default=1000,
+        help="Lines of generated step output (default: 1000)",
+    )
+    serve_parser.add_argument(
+        "--output-line-bytes",
+        type=int,
+        default=80,
+        help="Bytes per generated output line (default: 80)",
+    )
+    serve_parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help=f"Items per list page (default: {DEFAULT_PAGE_SIZE})",
+    )
+    serve_parser.add_argument(
+        "--pipelines",
+        type=int,
+        default=20,
+        help="Pipelines in the synthetic project (default: 20)",
+    )
+    serve_parser.set_defaults(func=serve)
+
+    record_parser = sub.add_parser("record", help="Record a fixture from the real API.")
+    record_parser.add_argument("project_slug", help="Project slug, e.g. gh/org/repo")
+    record_parser.add_argument("--branch", help="Only record pipelines of this branch")
+    record_parser.add_argument(
+        "--pipelines", type=int, default=5, help="Pipelines to record (default: 5)"
+    )
+    record_parser.add_argument(
+        "--all-output",
+        action="store_true",
+        help="Also record output of successful steps (default: failed steps only)",
+    )
+    record_parser.add_argument("--out", required=True, help="Fixture file to write")
+    record_parser.add_argument(
+        "--host",
+        default="https://circleci.com",
+        help="CircleCI host (default: https://circleci.com)",
+    )
+    record_parser.set_defaults(func=record)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
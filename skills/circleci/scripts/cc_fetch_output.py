@@ -1,24 +1,61 @@
 #!/usr/bin/env python3
 """Fetch CircleCI step output from a presigned output_url."""
 
+import argparse
 import json
-import sys
-from urllib.request import urlopen
 
+from cc_jsonl import emit
+from cc_logscan import scan_lines
+from cc_stream import filter_lines, iter_step_messages
 
-def main() -> int:
-    if len(sys.argv) < 2:
-        print("Usage: cc_fetch_output.py <output-url>")
-        return 2
 
-    output_url = sys.argv[1].strip()
-    with urlopen(output_url) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Stream CircleCI step output from a presigned output_url."
+    )
+    parser.add_argument("output_url", help="Presigned output_url of a step action")
+    parser.add_argument("--tail", type=int, help="Only print the last N lines")
+    parser.add_argument("--grep", metavar="PATTERN", help="Only print lines matching PATTERN")
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Print a compact JSON summary of extracted failures instead of the log",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Emit one compact JSON record per output line (or the summary) as it arrives",
+    )
+    return parser.parse_args(argv)
 
-    for item in data:
-        message = item.get("message", "").strip()
-        if message:
-            print(message)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    messages = iter_step_messages(args.output_url.strip())
+    if args.summary:
+        summary = scan_lines(filter_lines(messages, args.grep, args.tail))
+        if args.jsonl:
+            emit("summary", **summary)
+        else:
+            print(json.dumps(summary, separators=(",", ":")))
+        return 0
+
+    if args.jsonl:
+        for line in filter_lines(messages, args.grep, args.tail):
+            if line.strip():
+                emit("line", text=line)
+        return 0
+
+    if args.tail is None and args.grep is None:
+        for message in messages:
+            message = message.strip()
+            if message:
+                print(message)
+        return 0
+
+    for line in filter_lines(messages, args.grep, args.tail):
+        print(line)
 
     return 0
 
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""SQLite index of failing tests across CircleCI pipelines."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+
+from cc_cache import ResponseCache, output_key
+from cc_logscan import scan_lines
+from cc_stream import filter_lines, iter_step_messages
+
+FAILED_ACTION_STATUSES = ("failed", "timedout", "infrastructure_fail")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pipelines (
+    host TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    id TEXT NOT NULL,
+    number INTEGER,
+    branch TEXT,
+    revision TEXT,
+    created_at TEXT,
+    complete INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (host, slug, id)
+);
+CREATE INDEX IF NOT EXISTS pipelines_by_branch ON pipelines (host, slug, branch, number);
+CREATE TABLE IF NOT EXISTS jobs (
+    host TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    job_number INTEGER NOT NULL,
+    pipeline_id TEXT NOT NULL,
+    workflow TEXT,
+    name TEXT,
+    status TEXT,
+    PRIMARY KEY (host, slug, job_number)
+);
+CREATE INDEX IF NOT EXISTS jobs_by_pipeline ON jobs (host, slug, pipeline_id);
+CREATE TABLE IF NOT EXISTS failures (
+    host TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    job_number INTEGER NOT NULL,
+    test TEXT NOT NULL,
+    kind TEXT,
+    step TEXT,
+    PRIMARY KEY (host, slug, job_number, test)
+);
+CREATE INDEX IF NOT EXISTS failures_by_test ON failures (host, slug, test);
+"""
+
+
+def default_index_path() -> str:
+    return os.environ.get("CIRCLECI_FLAKY_DB") or os.path.join(
+        ResponseCache().root, "flaky.sqlite3"
+    )
+
+
+def failing_tests(details: dict, cache: ResponseCache, key: str) -> dict[str, dict]:
+    """Scan a job's failed step output (API v1.1 details) for failing test names."""
+    tests: dict[str, dict] = {}
+    for step_index, step in enumerate(details.get("steps", [])):
+        for action in step.get("actions", []):
+            if action.get("status") not in FAILED_ACTION_STATUSES or not action.get("output_url"):
+                continue
+            messages = iter_step_messages(
+                action["output_url"], cache, output_key(key, step_index, action)
+            )
+            for record in scan_lines(filter_lines(messages))["failures"]:
+                if record.get("test"):
+                    tests.setdefault(
+                        record["test"], {"kind": record["kind"], "step": step.get("name", "")}
+                    )
+    return tests
+
+
+class FlakyIndex:
+    """Pipelines, jobs and per-test failures, keyed by host and project slug.
+
+    Only the calling thread touches the connection; fetch concurrently and
+    record the results from one thread.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path or default_index_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def complete_pipelines(self, host: str, slug: str) -> set[str]:
+        rows = self.db.execute(
+            "SELECT id FROM pipelines WHERE host = ? AND slug = ? AND complete = 1", (host, slug)
+        )
+        return {row[0] for row in rows}
+
+    def indexed_jobs(self, host: str, slug: str) -> set[int]:
+        rows = self.db.execute("SELECT job_number FROM jobs WHERE host = ? AND slug = ?", (host, slug))
+        return {row[0] for row in rows}
+
+    def add_pipeline(self, host: str, slug: str, pipeline: dict, complete: bool) -> None:
+        vcs = pipeline.get("vcs", {})
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pipelines VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    host,
+                    slug,
+                    pipeline["id"],
+                    pipeline.get("number"),
+                    vcs.get("branch"),
+                    vcs.get("revision"),
+                    pipeline.get("created_at"),
+                    int(complete),
+                ),
+            )
+
+    def add_job(
+        self, host: str, slug: str, pipeline_id: str, workflow: str, job: dict, tests: dict
+    ) -> None:
+        number = int(job["job_number"])
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (host, slug, number, pipeline_id, workflow, job.get("name"), job.get("status")),
+            )
+            self.db.execute(
+                "DELETE FROM failures WHERE host = ? AND slug = ? AND job_number = ?",
+                (host, slug, number),
+            )
+            self.db.executemany(
+                "INSERT INTO failures VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (host, slug, number, test, info["kind"], info["step"])
+                    for test, info in tests.items()
+                ],
+            )
+
+    def test_history(
+        self, host: str, slug: str, test: str, last: int, branch: str | None = None
+    ) -> dict:
+        """Failures of ``test`` in the ``last`` indexed pipelines (optionally one branch).
+
+        ``test`` is matched exactly, or as a SQL LIKE pattern when it contains
+        ``%``. Each occurrence notes whether the same job passed on the same
+        revision elsewhere, the usual sign of a flaky test.
+        """
+        branch_filter = "AND branch = ?" if branch else ""
+        recent_params = [host, slug] + ([branch] if branch else []) + [last]
+        recent_sql = (
+            "SELECT id, number, branch, revision FROM pipelines "
+            f"WHERE host = ? AND slug = ? {branch_filter} ORDER BY number DESC LIMIT ?"
+        )
+        pipelines = self.db.execute(f"SELECT COUNT(*) FROM ({recent_sql})", recent_params)
+        pipeline_count = pipelines.fetchone()[0]
+        operator = "LIKE" if "%" in test else "="
+        rows = self.db.execute(
+            f"""
+            WITH recent AS ({recent_sql})
+            SELECT r.number, r.branch, r.revision, j.job_number, j.workflow, j.name,
+                   f.test, f.step,
+                   EXISTS (
+                       SELECT 1 FROM jobs j2 JOIN pipelines p2
+                         ON p2.host = j2.host AND p2.slug = j2.slug AND p2.id = j2.pipeline_id
+                       WHERE j2.host = j.host AND j2.slug = j.slug AND j2.name = j.name
+                         AND p2.revision = r.revision AND j2.status = 'success'
+                   )
+            FROM failures f
+            JOIN jobs j ON j.host = f.host AND j.slug = f.slug AND j.job_number = f.job_number
+            JOIN recent r ON r.id = j.pipeline_id
+            WHERE f.host = ? AND f.slug = ? AND f.test {operator} ?
+            ORDER BY r.number DESC, j.job_number
+            """,
+            recent_params + [host, slug, test],
+        )
+        occurrences = [
+            {
+                "pipeline_number": number,
+                "branch": row_branch,
+                "revision": revision,
+                "job_number": job_number,
+                "workflow": workflow,
+                "job": name,
+                "test": row_test,
+                "step": step,
+                "passed_on_same_revision": bool(passed),
+            }
+            for (
+                number,
+                row_branch,
+                revision,
+                job_number,
+                workflow,
+                name,
+                row_test,
+                step,
+                passed,
+            ) in rows
+        ]
+        return {
+            "test": test,
+            "branch": branch,
+            "pipelines": pipeline_count,
+            "failed_pipelines": len({item["pipeline_number"] for item in occurrences}),
+            "occurrences": occurrences,
+        }
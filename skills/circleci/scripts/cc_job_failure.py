@@ -1,78 +1,211 @@
 #!/usr/bin/env python3
 """Fetch failing CircleCI job step output (API v1.1 for output_url support)."""
 
+import argparse
 import json
-import os
-import re
+import shutil
 import sys
-from pathlib import Path
-from urllib.request import Request, urlopen
-
-
-def load_token() -> str:
-    """Load CircleCI token from env vars or ~/.circleci/cli.yml."""
-    token = os.environ.get("CIRCLECI_CLI_TOKEN") or os.environ.get("CIRCLE_TOKEN")
-    if token:
-        return token
-
-    config_path = Path.home() / ".circleci" / "cli.yml"
-    if not config_path.exists():
-        raise RuntimeError("CircleCI CLI config not found at ~/.circleci/cli.yml")
-
-    for line in config_path.read_text().splitlines():
-        line = line.split("#", 1)[0].strip()
-        if not line:
-            continue
-        match = re.match(r"^token\s*:\s*(.+)$", line)
-        if match:
-            token = match.group(1).strip()
-            if len(token) >= 2 and token[0] in "\"'" and token[-1] == token[0]:
-                token = token[1:-1]
-            if token:
-                return token
-
-    raise RuntimeError("CircleCI token not found in ~/.circleci/cli.yml")
-
-
-def main() -> int:
-    if len(sys.argv) < 3:
-        print("Usage: cc_job_failure.py <gh/org/repo> <job-number>")
-        return 2
-
-    slug = sys.argv[1].strip()
-    job_number = sys.argv[2].strip()
-    token = load_token()
-
-    url = f"https://circleci.com/api/v1.1/project/github/{slug}/{job_number}"
-    req = Request(url)
-    req.add_header("Circle-Token", token)
-    with urlopen(req) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cc_cache import ResponseCache, job_key, output_key
+from cc_config import token_or_exit
+from cc_http import get_json
+from cc_jsonl import dumps, emit
+from cc_logscan import scan_lines
+from cc_stream import filter_lines, iter_step_messages
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Fetch failing CircleCI job step output (API v1.1)."
+    )
+    parser.add_argument("repo", help="GitHub org/repo")
+    parser.add_argument("job_number", help="Job number")
+    parser.add_argument(
+        "--host",
+        default="https://circleci.com",
+        help="CircleCI host (default: https://circleci.com)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the local cache of finished jobs and step output",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Fetch every failed action (all steps and parallel containers)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Max parallel output downloads with --all (default: 8)",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Print a compact JSON summary of extracted failures instead of the log",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Emit one compact JSON record per output line (or per summary) as it arrives",
+    )
+    return parser.parse_args(argv)
+
+
+def collect_failed_actions(data: dict) -> list:
+    """Return (step_name, step_index, action) for every failed action, in step order."""
+    failed = []
+    for step_index, step in enumerate(data.get("steps", [])):
+        for action in step.get("actions", []):
+            if action.get("status") == "failed" and action.get("output_url"):
+                failed.append((step.get("name"), step_index, action))
+    return failed
+
+
+def line_renderer(step_name: str, action: dict, jsonl: bool):
+    """Return how one output message is printed: as is, or as a JSONL ``line`` record."""
+    if not jsonl:
+        return str
+    container = action.get("index", 0)
+    return lambda message: dumps("line", step=step_name, container=container, text=message)
+
+
+def print_step_output(output_url: str, cache: ResponseCache, cache_key: str, render=str) -> None:
+    for message in iter_step_messages(output_url, cache, cache_key):
+        message = message.strip()
+        if message:
+            print(render(message))
+
+
+def spool_step_output(output_url: str, cache: ResponseCache, cache_key: str, render=str):
+    """Download one action's messages into a temp file (kept in memory while small)."""
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", encoding="utf-8")
+    try:
+        for message in iter_step_messages(output_url, cache, cache_key):
+            message = message.strip()
+            if message:
+                spool.write(render(message))
+                spool.write("\n")
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def print_all_failed(
+    failed: list, cache: ResponseCache, key: str, concurrency: int, jsonl: bool = False
+) -> None:
+    """Download all failed outputs concurrently and print them in step/container order."""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [
+            pool.submit(
+                spool_step_output,
+                action["output_url"],
+                cache,
+                output_key(key, step_index, action),
+                line_renderer(step_name, action, jsonl),
+            )
+            for step_name, step_index, action in failed
+        ]
+        try:
+            for (step_name, _, action), future in zip(failed, futures):
+                if not jsonl:
+                    print(f"failed-step {step_name} container {action.get('index', 0)}")
+                with future.result() as spool:
+                    sys.stdout.flush()
+                    shutil.copyfileobj(spool, sys.stdout)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def iter_summaries(
+    failed: list, cache: ResponseCache, key: str, concurrency: int, ordered: bool = True
+):
+    """Scan failed outputs concurrently into failure summaries.
+
+    Summaries come in step/container order, or as each scan finishes when
+    ``ordered`` is false.
+    """
+
+    def summarize(entry) -> dict:
+        step_name, step_index, action = entry
+        messages = iter_step_messages(
+            action["output_url"], cache, output_key(key, step_index, action)
+        )
+        return {
+            "step": step_name,
+            "container": action.get("index", 0),
+            **scan_lines(filter_lines(messages)),
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        if ordered:
+            yield from pool.map(summarize, failed)
+            return
+        for future in as_completed([pool.submit(summarize, entry) for entry in failed]):
+            yield future.result()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    slug = args.repo.strip()
+    job_number = args.job_number.strip()
+    host = args.host.rstrip("/")
+    token = token_or_exit()
+    cache = ResponseCache(enabled=not args.no_cache)
+
+    url = f"{host}/api/v1.1/project/github/{slug}/{job_number}"
+    key = job_key(host, slug, job_number, "v1.1")
+    data, from_cache = cache.get_or_fetch_json(key, lambda: get_json(url, token))
+    failed = collect_failed_actions(data)
+    if not args.all:
+        failed = failed[:1]
+    if from_cache and not all(
+        cache.contains(output_key(key, step_index, action)) for _, step_index, action in failed
+    ):
+        # Presigned output_urls in a cached job may have expired; only trust them
+        # when the output itself is cached, otherwise refresh the job once.
+        data = get_json(url, token)
+        cache.put_json(key, data)
+        failed = collect_failed_actions(data)
+        if not args.all:
+            failed = failed[:1]
+
+    if args.jsonl:
+        emit("job", job_number=job_number, status=data.get("status"), failed_steps=len(failed))
+        if args.summary:
+            for summary in iter_summaries(failed, cache, key, args.concurrency, ordered=False):
+                emit("summary", **summary)
+        elif failed:
+            print_all_failed(failed, cache, key, args.concurrency, jsonl=True)
+        return 0
+
+    if args.summary:
+        summaries = list(iter_summaries(failed, cache, key, args.concurrency))
+        payload = {"job_number": job_number, "status": data.get("status"), "steps": summaries}
+        print(json.dumps(payload, separators=(",", ":")))
+        return 0
 
     print(f"status {data.get('status')}")
-    output_url = None
-    step_name = None
-    for step in data.get("steps", []):
-        for action in step.get("actions", []):
-            if action.get("status") == "failed":
-                output_url = action.get("output_url")
-                step_name = step.get("name")
-                break
-        if output_url:
-            break
-
-    if not output_url:
+    if not failed:
         print("No failed step output url found.")
         return 0
 
-    with urlopen(output_url) as resp:
-        output_data = json.loads(resp.read().decode("utf-8"))
+    if args.all:
+        print_all_failed(failed, cache, key, args.concurrency)
+        return 0
 
+    step_name, step_index, action = failed[0]
     print(f"failed-step {step_name}")
-    for item in output_data:
-        message = item.get("message", "").strip()
-        if message:
-            print(message)
+    print_step_output(action["output_url"], cache, output_key(key, step_index, action))
 
     return 0
 
@@ -1,53 +1,66 @@
 #!/usr/bin/env python3
 """List CircleCI job steps and action statuses (API v1.1)."""
 
-import json
-import os
-import re
-import sys
-from pathlib import Path
-from urllib.request import Request, urlopen
+import argparse
 
+from cc_cache import ResponseCache, get_job_details, job_key
+from cc_config import token_or_exit
+from cc_http import get_json
+from cc_jsonl import emit
 
-def load_token() -> str:
-    """Load CircleCI token from env vars or ~/.circleci/cli.yml."""
-    token = os.environ.get("CIRCLECI_CLI_TOKEN") or os.environ.get("CIRCLE_TOKEN")
-    if token:
-        return token
 
-    config_path = Path.home() / ".circleci" / "cli.yml"
-    if not config_path.exists():
-        raise RuntimeError("CircleCI CLI config not found at ~/.circleci/cli.yml")
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="List CircleCI job steps and action statuses (API v1.1)."
+    )
+    parser.add_argument("repo", help="GitHub org/repo")
+    parser.add_argument("job_number", help="Job number")
+    parser.add_argument(
+        "--host",
+        default="https://circleci.com",
+        help="CircleCI host (default: https://circleci.com)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the local cache of finished jobs",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Emit one compact JSON record per entity as soon as it is known",
+    )
+    return parser.parse_args(argv)
 
-    for line in config_path.read_text().splitlines():
-        line = line.split("#", 1)[0].strip()
-        if not line:
-            continue
-        match = re.match(r"^token\s*:\s*(.+)$", line)
-        if match:
-            token = match.group(1).strip()
-            if len(token) >= 2 and token[0] in "\"'" and token[-1] == token[0]:
-                token = token[1:-1]
-            if token:
-                return token
 
-    raise RuntimeError("CircleCI token not found in ~/.circleci/cli.yml")
+def main(argv=None) -> int:
+    args = parse_args(argv)
 
+    slug = args.repo.strip()
+    job_number = args.job_number.strip()
+    host = args.host.rstrip("/")
+    token = token_or_exit()
+    cache = ResponseCache(enabled=not args.no_cache)
 
-def main() -> int:
-    if len(sys.argv) < 3:
-        print("Usage: cc_job_steps.py <gh/org/repo> <job-number>")
-        return 2
+    url = f"{host}/api/v1.1/project/github/{slug}/{job_number}"
+    data, _ = get_job_details(
+        cache, job_key(host, slug, job_number, "v1.1"), lambda: get_json(url, token)
+    )
 
-    slug = sys.argv[1].strip()
-    job_number = sys.argv[2].strip()
-    token = load_token()
-
-    url = f"https://circleci.com/api/v1.1/project/github/{slug}/{job_number}"
-    req = Request(url)
-    req.add_header("Circle-Token", token)
-    with urlopen(req) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
+    if args.jsonl:
+        emit("job", job_number=job_number, status=data.get("status"))
+        for step in data.get("steps", []):
+            for action in step.get("actions", []):
+                emit(
+                    "action",
+                    step=step.get("name"),
+                    name=action.get("name"),
+                    index=action.get("index", 0),
+                    status=action.get("status"),
+                    message=action.get("message"),
+                    output_url=action.get("output_url"),
+                )
+        return 0
 
     print(f"status {data.get('status')}")
     for step in data.get("steps", []):
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""Compact JSON Lines records for the scripts' machine-readable output."""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+
+_lock = threading.Lock()
+
+
+def dumps(kind: str, **fields) -> str:
+    return json.dumps({"kind": kind, **fields}, separators=(",", ":"))
+
+
+def emit(kind: str, **fields) -> None:
+    """Write one ``{"kind": ..., ...}`` record and flush it so consumers see it now."""
+    line = dumps(kind, **fields) + "\n"
+    with _lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Single-pass extraction of failure records from CircleCI step output."""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+DEFAULT_MAX_RECORDS = 200
+MAX_TRACEBACK_FRAMES = 3
+
+_ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+# Each rule is (name, kind, pattern), anchored at the start of the line. The
+# patterns are joined into one alternation so every line costs a single
+# regex match; the individual pattern is only re-run on the rare lines that
+# match, to pull out fields.
+_RULES = [
+    ("pytest_failed", "pytest", r"(?:FAILED|ERROR) (?P<test>\S+::\S+)(?: - (?P<message>.*))?$"),
+    ("pytest_summary", "pytest", r"=+ (?P<message>.*\b\d+ (?:failed|errors?)\b.*) =+$"),
+    ("jest_file", "jest", r"\s*FAIL\s+(?P<file>\S+\.[jt]sx?)\b"),
+    ("jest_test", "jest", r"\s*● (?P<test>.+? › .+)$"),
+    ("go_test", "go", r"\s*--- FAIL: (?P<test>\S+)(?: \((?P<duration>[\d.]+s)\))?"),
+    ("go_package", "go", r"FAIL\s+(?P<package>\S+)\s+[\d.]+s$"),
+    ("go_panic", "go", r"panic: (?P<message>.+)$"),
+    ("traceback", "traceback", r"Traceback \(most recent call last\):$"),
+    (
+        "compiler",
+        "compiler",
+        r"(?P<file>[^\s:()]+?)(?::(?P<line>\d+)(?::(?P<column>\d+))?|\((?P<pline>\d+),(?P<pcolumn>\d+)\))"
+        r": (?:fatal )?error(?: (?P<code>[A-Z]+\d+))?: (?P<message>.+)$",
+    ),
+    ("rustc", "compiler", r"error(?:\[(?P<code>E\d+)\])?: (?P<message>.+)$"),
+]
+
+_COMBINED = re.compile(
+    "|".join(
+        f"(?P<{name}>{pattern.replace('(?P<', f'(?P<{name}__')})" for name, _, pattern in _RULES
+    )
+)
+_PATTERNS = {name: (kind, re.compile(pattern)) for name, kind, pattern in _RULES}
+
+# Exit codes appear anywhere in a line, so they are searched for only on lines
+# containing "xit" (exit, Exited) or "Error ".
+_EXIT_CODE = re.compile(
+    r"(?:Exited with code (?:exit status )?|exit status |exit code:? |\bError )(?P<code>\d+)\s*$"
+)
+
+
+class FailureScanner:
+    """Feed lines one at a time; keeps only the records, never the log itself."""
+
+    def __init__(self, max_records: int = DEFAULT_MAX_RECORDS) -> None:
+        self.max_records = max_records
+        self.lines = 0
+        self.records: list[dict] = []
+        self.exit_codes: list[dict] = []
+        self.dropped = 0
+        self._traceback: dict | None = None
+
+    def _add(self, record: dict) -> None:
+        if len(self.records) < self.max_records:
+            self.records.append(record)
+        else:
+            self.dropped += 1
+
+    def feed(self, line: str) -> None:
+        self.lines += 1
+        line = line.rstrip("\r\n")
+        if "\x1b" in line:
+            line = _ANSI.sub("", line)
+        if self._traceback is not None:
+            if line[:1].isspace():
+                if line.lstrip().startswith("File "):
+                    frames = self._traceback["frames"]
+                    frames.append(line.strip())
+                    del frames[:-MAX_TRACEBACK_FRAMES]
+                return
+            if line.strip():
+                self._traceback["message"] = line.strip()
+                self._add(self._traceback)
+                self._traceback = None
+                return
+        match = _COMBINED.match(line)
+        if match is None:
+            if "xit" in line or "Error " in line:
+                exit_match = _EXIT_CODE.search(line)
+                if exit_match and len(self.exit_codes) < self.max_records:
+                    self.exit_codes.append(
+                        {"line": self.lines, "code": int(exit_match.group("code"))}
+                    )
+            return
+        name = match.lastgroup
+        kind, pattern = _PATTERNS[name]
+        fields = {key: value for key, value in pattern.match(line).groupdict().items() if value}
+        if name == "traceback":
+            self._traceback = {"kind": kind, "rule": name, "line": self.lines, "frames": []}
+            return
+        if name == "compiler":
+            # "line" is the record's offset in the log; keep the source position apart.
+            fields["source_line"] = fields.pop("line", None) or fields.pop("pline")
+            fields["column"] = fields.pop("column", None) or fields.pop("pcolumn", None)
+        record = {"kind": kind, "rule": name, "line": self.lines}
+        record.update({key: value for key, value in fields.items() if value is not None})
+        self._add(record)
+
+    def summary(self) -> dict:
+        if self._traceback is not None:
+            self._add(self._traceback)
+            self._traceback = None
+        counts: dict[str, int] = {}
+        for record in self.records:
+            counts[record["kind"]] = counts.get(record["kind"], 0) + 1
+        return {
+            "lines": self.lines,
+            "counts": counts,
+            "failures": self.records,
+            "exit_codes": self.exit_codes,
+            "dropped": self.dropped,
+        }
+
+
+def scan_lines(lines: Iterable[str], max_records: int = DEFAULT_MAX_RECORDS) -> dict:
+    scanner = FailureScanner(max_records)
+    for line in lines:
+        scanner.feed(line)
+    return scanner.summary()
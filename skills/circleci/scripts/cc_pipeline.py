@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""CircleCI status sets, poll scheduling and pipeline lookup shared by the scripts."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from cc_http import iter_items
+
+ACTIVE_JOB_STATUSES = {"running", "queued", "blocked", "on_hold", "not_running"}
+TERMINAL_WORKFLOW_STATUSES = {"success", "failed", "error", "canceled", "not_run", "unauthorized"}
+FAILED_JOB_STATUSES = {"failed", "infrastructure_fail", "timedout", "terminated-unknown"}
+FAILED_WORKFLOW_STATUSES = {"failed", "error", "failing"}
+# How many of a branch's newest pipelines --sha searches before giving up.
+SHA_SEARCH_LIMIT = 200
+# New pipelines appear at the head of the list, so later polls while waiting
+# for one only need the first page.
+SHA_POLL_LIMIT = 20
+
+
+def find_pipeline(
+    token: str, base: str, slug: str, branch: str, sha: str | None = None, limit: int = SHA_SEARCH_LIMIT
+) -> dict | None:
+    """Return the newest pipeline of ``branch``, or the newest one built from ``sha``.
+
+    ``sha`` may be an abbreviated revision. Pages are fetched one at a time and
+    the search stops at the first match.
+    """
+    items = iter_items(
+        f"{base}/project/{slug}/pipeline",
+        token,
+        params={"branch": branch},
+        limit=limit if sha else 1,
+        prefetch=False,
+    )
+    for pipeline in items:
+        if sha is None or (pipeline.get("vcs", {}).get("revision") or "").startswith(sha):
+            return pipeline
+    return None
+
+
+def wait_for_pipeline(
+    token: str, base: str, slug: str, branch: str, sha: str | None, timeout: float, schedule
+) -> dict | None:
+    """Call ``find_pipeline`` until it finds a pipeline or ``timeout`` seconds pass."""
+    deadline = time.monotonic() + timeout
+    limit = SHA_SEARCH_LIMIT
+    while True:
+        pipeline = find_pipeline(token, base, slug, branch, sha, limit)
+        remaining = deadline - time.monotonic()
+        if pipeline is not None or remaining <= 0:
+            return pipeline
+        limit = SHA_POLL_LIMIT
+        time.sleep(min(remaining, schedule.next(False)))
+
+
+def normalize_sha(sha: str | None) -> str | None:
+    if sha is None:
+        return None
+    sha = sha.strip().lower()
+    if len(sha) < 4 or any(c not in "0123456789abcdef" for c in sha):
+        raise argparse.ArgumentTypeError(f"not a commit SHA: {sha!r}")
+    return sha
+
+
+class AdaptiveInterval:
+    """Poll delay that resets on change and backs off exponentially while idle."""
+
+    def __init__(self, minimum: float, maximum: float, factor: float = 2.0, jitter: float = 0.1) -> None:
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.factor = factor
+        self.jitter = jitter
+        self.current = minimum
+
+    def next(self, changed: bool) -> float:
+        if changed:
+            self.current = self.minimum
+        else:
+            self.current = min(self.maximum, self.current * self.factor)
+        spread = self.current * self.jitter
+        return max(0.0, self.current + random.uniform(-spread, spread))
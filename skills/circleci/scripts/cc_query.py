@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Run cc_status.py subcommands through the local query daemon.
+
+Usage is identical to cc_status.py. The daemon (cc_daemon.py) is started on
+demand; if it cannot be reached the query runs in-process instead.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from cc_daemon import default_socket_path, owned_by_me, query_env
+
+START_TIMEOUT = 5.0
+NO_DAEMON_ENV_VAR = "CIRCLECI_NO_DAEMON"
+
+
+def _connect(path: str):
+    if not owned_by_me(path):
+        # Missing, or planted by another user who would receive our token.
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _start_daemon(path: str):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cc_daemon.py")
+    subprocess.Popen(
+        [sys.executable, script, "--socket", path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        sock = _connect(path)
+        if sock is not None:
+            return sock
+        time.sleep(0.05)
+    return None
+
+
+def _request(sock, request: dict) -> int:
+    with sock, sock.makefile("rb") as frames:
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        for raw in frames:
+            frame = json.loads(raw)
+            if "stdout" in frame:
+                sys.stdout.write(frame["stdout"])
+            if "stderr" in frame:
+                sys.stderr.write(frame["stderr"])
+            if "exit" in frame:
+                sys.stdout.flush()
+                return frame["exit"]
+    print("Daemon closed the connection unexpectedly.", file=sys.stderr)
+    return 1
+
+
+def _run_in_process(argv: list) -> int:
+    import cc_status
+
+    return cc_status.main(argv)
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    try:
+        path = default_socket_path()
+    except PermissionError as exc:
+        print(f"Not using the query daemon: {exc}", file=sys.stderr)
+        return _run_in_process(argv)
+    if argv == ["--stop"]:
+        sock = _connect(path)
+        return _request(sock, {"command": "stop"}) if sock else 0
+    if os.environ.get(NO_DAEMON_ENV_VAR):
+        return _run_in_process(argv)
+
+    if os.path.exists(path) and not owned_by_me(path):
+        print(f"Not using the query daemon: {path} belongs to another user", file=sys.stderr)
+        return _run_in_process(argv)
+    sock = _connect(path) or _start_daemon(path)
+    if sock is None:
+        return _run_in_process(argv)
+    return _request(sock, {"argv": argv, "cwd": os.getcwd(), "env": query_env()})
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,18 +6,26 @@ from __future__ import annotations
 
 import argparse
 import json
-import os
-import re
 import sys
 import urllib.parse
-import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from cc_cache import ResponseCache, get_job_details, is_terminal, job_key
+from cc_config import ConfigError, load_token
+from cc_flaky import FlakyIndex, failing_tests
+from cc_http import HTTPError, get_json, iter_items
+from cc_jsonl import emit
+from cc_pipeline import TERMINAL_WORKFLOW_STATUSES
+
+
+# Finished pipelines younger than this are listed again to pick up reruns.
+RERUN_WINDOW_DAYS = 14
 
 
 def _api_get(url: str, token: str) -> dict:
-    req = urllib.request.Request(url)
-    req.add_header("Circle-Token", token)
-    with urllib.request.urlopen(req) as resp:
-        return json.load(resp)
+    return get_json(url, token)
 
 
 def _print_json(payload: dict) -> None:
@@ -25,17 +33,22 @@ def _print_json(payload: dict) -> None:
     sys.stdout.write("\n")
 
 
+def _print_json_items(items) -> None:
+    """Print ``{"items": [...]}`` like ``_print_json``, writing each item as its page arrives."""
+    sys.stdout.write('{\n  "items": [')
+    separator = "\n"
+    for item in items:
+        body = json.dumps(item, indent=2).replace("\n", "\n    ")
+        sys.stdout.write(f"{separator}    {body}")
+        separator = ",\n"
+    sys.stdout.write("\n  ]\n}\n" if separator != "\n" else "]\n}\n")
+
+
 def _token(args: argparse.Namespace) -> str:
-    token = args.token or os.environ.get("CIRCLECI_CLI_TOKEN") or os.environ.get(
-        "CIRCLECI_TOKEN"
-    )
-    if not token:
-        token = _token_from_cli_config()
-    if not token:
-        raise SystemExit(
-            "Missing token. Set CIRCLECI_CLI_TOKEN, run `circleci setup`, or pass --token."
-        )
-    return token
+    try:
+        return load_token(args.token)
+    except ConfigError as exc:
+        raise SystemExit(f"{exc} Or pass --token.") from exc
 
 
 def _host(args: argparse.Namespace) -> str:
@@ -46,25 +59,6 @@ def _quote_slug(slug: str) -> str:
     return urllib.parse.quote(slug, safe="/")
 
 
-def _token_from_cli_config() -> str | None:
-    path = os.path.expanduser("~/.circleci/cli.yml")
-    try:
-        with open(path, "r", encoding="utf-8") as handle:
-            for raw in handle:
-                line = raw.split("#", 1)[0].strip()
-                if not line:
-                    continue
-                match = re.match(r"^token\s*:\s*(.+)$", line)
-                if match:
-                    token = match.group(1).strip()
-                    if token and token[0] in "\"'" and token[-1] == token[0]:
-                        token = token[1:-1]
-                    return token or None
-    except FileNotFoundError:
-        return None
-    return None
-
-
 def cmd_pipelines(args: argparse.Namespace) -> None:
     token = _token(args)
     host = _host(args)
@@ -72,15 +66,16 @@ def cmd_pipelines(args: argparse.Namespace) -> None:
     params = {}
     if args.branch:
         params["branch"] = args.branch
-    if args.limit:
-        params["limit"] = str(args.limit)
-    query = f"?{urllib.parse.urlencode(params)}" if params else ""
-    url = f"{host}/api/v2/project/{slug}/pipeline{query}"
-    payload = _api_get(url, token)
+    url = f"{host}/api/v2/project/{slug}/pipeline"
+    items = iter_items(url, token, params=params, limit=args.limit)
+    if args.jsonl:
+        for item in items:
+            emit("pipeline", **item)
+        return
     if args.json:
-        _print_json(payload)
+        _print_json_items(items)
         return
-    for item in payload.get("items", []):
+    for item in items:
         vcs = item.get("vcs", {})
         branch = vcs.get("branch", "")
         revision = vcs.get("revision", "")
@@ -96,11 +91,15 @@ def cmd_workflows(args: argparse.Namespace) -> None:
     token = _token(args)
     host = _host(args)
     url = f"{host}/api/v2/pipeline/{args.pipeline_id}/workflow"
-    payload = _api_get(url, token)
+    items = iter_items(url, token, limit=args.limit)
+    if args.jsonl:
+        for item in items:
+            emit("workflow", **item)
+        return
     if args.json:
-        _print_json(payload)
+        _print_json_items(items)
         return
-    for item in payload.get("items", []):
+    for item in items:
         print(f"{item.get('id','')}\t{item.get('name','')}\t{item.get('status','')}")
 
 
@@ -108,11 +107,15 @@ def cmd_jobs(args: argparse.Namespace) -> None:
     token = _token(args)
     host = _host(args)
     url = f"{host}/api/v2/workflow/{args.workflow_id}/job"
-    payload = _api_get(url, token)
+    items = iter_items(url, token, limit=args.limit)
+    if args.jsonl:
+        for item in items:
+            emit("job", **item)
+        return
     if args.json:
-        _print_json(payload)
+        _print_json_items(items)
         return
-    for item in payload.get("items", []):
+    for item in items:
         print(
             f"{item.get('job_number','')}\t{item.get('name','')}\t{item.get('status','')}"
         )
@@ -123,7 +126,15 @@ def cmd_job(args: argparse.Namespace) -> None:
     host = _host(args)
     slug = _quote_slug(args.project_slug)
     url = f"{host}/api/v2/project/{slug}/job/{args.job_number}"
-    payload = _api_get(url, token)
+    cache = ResponseCache(enabled=not args.no_cache)
+    payload, _ = get_job_details(
+        cache,
+        job_key(host, args.project_slug, args.job_number, "v2"),
+        lambda: _api_get(url, token),
+    )
+    if args.jsonl:
+        emit("job", **payload)
+        return
     if args.json:
         _print_json(payload)
         return
@@ -144,9 +155,476 @@ def cmd_job(args: argparse.Namespace) -> None:
             print(f"{step_name}\t{action_name}\t{status}\t{output_url}")
 
 
+_V1_VCS = {"gh": "github", "github": "github", "bb": "bitbucket", "bitbucket": "bitbucket"}
+
+
+def _v1_job_url(host: str, project_slug: str, job_number) -> str | None:
+    """API v1.1 job URL (the only API exposing steps), or None for unsupported slugs."""
+    parts = project_slug.split("/")
+    vcs = _V1_VCS.get(parts[0]) if len(parts) == 3 else None
+    if vcs is None:
+        return None
+    org, repo = (_quote_slug(part) for part in parts[1:])
+    return f"{host}/api/v1.1/project/{vcs}/{org}/{repo}/{job_number}"
+
+
+def _failed_steps(job_details: dict) -> list[dict]:
+    failed = []
+    for step in job_details.get("steps", []):
+        for action in step.get("actions", []):
+            if action.get("status") in ("failed", "timedout", "infrastructure_fail"):
+                failed.append(
+                    {
+                        "step": step.get("name", ""),
+                        "index": action.get("index", 0),
+                        "status": action.get("status", ""),
+                        "output_url": action.get("output_url", ""),
+                    }
+                )
+    return failed
+
+
+def _wants_steps(args: argparse.Namespace, job: dict) -> bool:
+    return (
+        not args.no_steps
+        and job.get("job_number") is not None
+        and job.get("status") in ("failed", "timedout", "infrastructure_fail")
+    )
+
+
+def _build_tree(args: argparse.Namespace, token: str, host: str, pipeline: dict) -> dict:
+    """Expand a pipeline into workflows, jobs and failed steps.
+
+    Each level fans out on its own bounded thread pool; failed-job step lookups
+    start as soon as their workflow's job list arrives. With ``--jsonl`` every
+    pipeline, workflow and job record is emitted as soon as it is complete.
+    """
+    cache = ResponseCache(enabled=not args.no_cache)
+    if args.jsonl:
+        emit("pipeline", **pipeline)
+    workflows = list(iter_items(f"{host}/api/v2/pipeline/{pipeline['id']}/workflow", token))
+    if args.jsonl:
+        for workflow in workflows:
+            emit("workflow", **workflow)
+
+    def fetch_steps(job: dict) -> list[dict]:
+        url = _v1_job_url(host, args.project_slug, job["job_number"])
+        if url is None:
+            return []
+        details, _ = get_job_details(
+            cache,
+            job_key(host, args.project_slug, job["job_number"], "v1.1"),
+            lambda: _api_get(url, token),
+        )
+        return _failed_steps(details)
+
+    concurrency = max(1, args.concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as job_pool, ThreadPoolExecutor(
+        max_workers=concurrency
+    ) as step_pool:
+
+        def fetch_jobs(workflow: dict) -> list:
+            jobs = list(iter_items(f"{host}/api/v2/workflow/{workflow['id']}/job", token))
+            return [
+                (job, step_pool.submit(fetch_steps, job) if _wants_steps(args, job) else None)
+                for job in jobs
+            ]
+
+        job_futures = [job_pool.submit(fetch_jobs, wf) for wf in workflows]
+        tree_workflows = []
+        for workflow, future in zip(workflows, job_futures):
+            jobs = []
+            for job, steps_future in future.result():
+                jobs.append(
+                    {**job, "failed_steps": steps_future.result() if steps_future else []}
+                )
+                if args.jsonl:
+                    emit("job", **{"workflow_id": workflow["id"], **jobs[-1]})
+            tree_workflows.append({**workflow, "jobs": jobs})
+    return {**pipeline, "workflows": tree_workflows}
+
+
+def cmd_tree(args: argparse.Namespace) -> None:
+    token = _token(args)
+    host = _host(args)
+    if args.pipeline_id:
+        pipeline = _api_get(f"{host}/api/v2/pipeline/{args.pipeline_id}", token)
+    else:
+        params = {"branch": args.branch} if args.branch else {}
+        slug = _quote_slug(args.project_slug)
+        url = f"{host}/api/v2/project/{slug}/pipeline"
+        pipeline = next(iter_items(url, token, params=params, limit=1), None)
+        if pipeline is None:
+            raise SystemExit("No pipelines found.")
+    tree = _build_tree(args, token, host, pipeline)
+    if args.jsonl:
+        return
+    if args.json:
+        _print_json(tree)
+        return
+    vcs = tree.get("vcs", {})
+    print(
+        f"pipeline\t{tree.get('id','')}\t{tree.get('state','')}\t"
+        f"{tree.get('created_at','')}\t{vcs.get('branch','')}\t{vcs.get('revision','')[:7]}"
+    )
+    for workflow in tree["workflows"]:
+        print(
+            f"  workflow\t{workflow.get('id','')}\t{workflow.get('name','')}\t"
+            f"{workflow.get('status','')}"
+        )
+        for job in workflow["jobs"]:
+            print(
+                f"    job\t{job.get('job_number','')}\t{job.get('name','')}\t"
+                f"{job.get('status','')}"
+            )
+            for step in job["failed_steps"]:
+                print(
+                    f"      step\t{step['step']}\t{step['index']}\t{step['status']}\t"
+                    f"{step['output_url']}"
+                )
+
+
+def _workflows_finished(workflows: list) -> bool:
+    return bool(workflows) and all(
+        wf.get("status") in TERMINAL_WORKFLOW_STATUSES for wf in workflows
+    )
+
+
+def _recently_created(pipeline: dict, days: float) -> bool:
+    created = pipeline.get("created_at")
+    if not created:
+        return True
+    created_at = datetime.fromisoformat(created.replace("Z", "+00:00"))
+    return datetime.now(timezone.utc) - created_at < timedelta(days=days)
+
+
+def _pipeline_workflows(
+    host: str, token: str, cache: ResponseCache, pipeline: dict, fresh: bool = False
+) -> list:
+    """Return a pipeline's workflows, each with its ``jobs`` list.
+
+    The listing is cached once every workflow has finished. Rerunning a
+    workflow adds a new one to a finished pipeline, so ``fresh`` lists the
+    workflows again; job lists of finished workflows (a rerun never changes
+    them) still come from the cache.
+    """
+
+    def workflow_jobs(wf: dict) -> list:
+        def fetch_jobs() -> list:
+            return list(iter_items(f"{host}/api/v2/workflow/{wf['id']}/job", token))
+
+        if wf.get("status") not in TERMINAL_WORKFLOW_STATUSES:
+            return fetch_jobs()
+        jobs, _ = cache.get_or_fetch_json(
+            f"v2|{host}|workflow|{wf['id']}|jobs", fetch_jobs, store_if=lambda _: True
+        )
+        return jobs
+
+    def fetch() -> list:
+        workflows = iter_items(f"{host}/api/v2/pipeline/{pipeline['id']}/workflow", token)
+        return [{**wf, "jobs": workflow_jobs(wf)} for wf in workflows]
+
+    key = f"v2|{host}|pipeline|{pipeline['id']}|workflows"
+    if fresh:
+        workflows = fetch()
+        if _workflows_finished(workflows):
+            cache.put_json(key, workflows)
+        return workflows
+    workflows, _ = cache.get_or_fetch_json(key, fetch, store_if=_workflows_finished)
+    return workflows
+
+
+def cmd_index(args: argparse.Namespace) -> None:
+    token = _token(args)
+    host = _host(args)
+    slug = args.project_slug
+    cache = ResponseCache(enabled=not args.no_cache)
+    index = FlakyIndex(args.db)
+    params = {"branch": args.branch} if args.branch else {}
+    url = f"{host}/api/v2/project/{_quote_slug(slug)}/pipeline"
+
+    def scan(job: dict) -> dict:
+        job_url = _v1_job_url(host, slug, job["job_number"])
+        if job.get("status") != "failed" or job_url is None:
+            return {}
+        key = job_key(host, slug, job["job_number"], "v1.1")
+        details, hit = cache.get_or_fetch_json(key, lambda: _api_get(job_url, token))
+        try:
+            return failing_tests(details, cache, key)
+        except HTTPError as exc:
+            # Output URLs of cached job details expire; refresh them once.
+            if not hit or exc.status not in (400, 401, 403, 404):
+                raise
+            details = _api_get(job_url, token)
+            cache.put_json(key, details)
+            return failing_tests(details, cache, key)
+
+    stats = {"pipelines": 0, "jobs": 0, "failures": 0, "skipped_pipelines": 0, "skipped_jobs": 0}
+    try:
+        complete = index.complete_pipelines(host, slug)
+        known_jobs = index.indexed_jobs(host, slug)
+        pipelines = []
+        for pipeline in iter_items(url, token, params=params, limit=args.limit):
+            # Finished pipelines can still gain rerun workflows; recent ones are
+            # listed again and only their new jobs are indexed.
+            if pipeline["id"] in complete and not _recently_created(pipeline, args.recheck_days):
+                stats["skipped_pipelines"] += 1
+            else:
+                pipelines.append(pipeline)
+
+        concurrency = max(1, args.concurrency)
+        with ThreadPoolExecutor(max_workers=concurrency) as list_pool, ThreadPoolExecutor(
+            max_workers=concurrency
+        ) as scan_pool:
+            listings = [
+                list_pool.submit(
+                    _pipeline_workflows, host, token, cache, p, p["id"] in complete
+                )
+                for p in pipelines
+            ]
+            for pipeline, listing in zip(pipelines, listings):
+                workflows = listing.result()
+                finished = _workflows_finished(workflows)
+                scans = []
+                for workflow in workflows:
+                    for job in workflow["jobs"]:
+                        if job.get("job_number") is None:
+                            continue
+                        if int(job["job_number"]) in known_jobs:
+                            stats["skipped_jobs"] += 1
+                        elif is_terminal(job):
+                            future = scan_pool.submit(scan, job)
+                            scans.append((workflow.get("name", ""), job, future))
+                        else:
+                            finished = False
+                for workflow, job, future in scans:
+                    tests = future.result()
+                    index.add_job(host, slug, pipeline["id"], workflow, job, tests)
+                    stats["jobs"] += 1
+                    stats["failures"] += len(tests)
+                # Unfinished pipelines are walked again next time; their
+                # already-indexed jobs are skipped.
+                index.add_pipeline(host, slug, pipeline, complete=finished)
+                stats["pipelines"] += 1
+    finally:
+        index.close()
+
+    if args.jsonl:
+        emit("index", project_slug=slug, **stats)
+        return
+    if args.json:
+        _print_json(stats)
+        return
+    print(
+        f"indexed {stats['pipelines']} pipelines, {stats['jobs']} jobs, "
+        f"{stats['failures']} failing tests; skipped {stats['skipped_pipelines']} "
+        f"finished pipelines and {stats['skipped_jobs']} indexed jobs"
+    )
+
+
+def cmd_flaky(args: argparse.Namespace) -> None:
+    index = FlakyIndex(args.db)
+    try:
+        history = index.test_history(
+            _host(args), args.project_slug, args.test, args.last, args.branch
+        )
+    finally:
+        index.close()
+    if args.jsonl:
+        for item in history["occurrences"]:
+            emit("failure", **item)
+        emit(
+            "flaky",
+            **{key: value for key, value in history.items() if key != "occurrences"},
+        )
+        return
+    if args.json:
+        _print_json(history)
+        return
+    print(
+        f"{history['test']}\tfailed in {history['failed_pipelines']} of "
+        f"{history['pipelines']} pipelines"
+    )
+    for item in history["occurrences"]:
+        print(
+            f"  {item['pipeline_number']}\t{item['branch'] or ''}\t"
+            f"{(item['revision'] or '')[:7]}\t{item['job_number']}\t{item['job']}\t"
+            f"{item['test']}\t{'passed-on-same-revision' if item['passed_on_same_revision'] else 'new'}"
+        )
+
+
+def _seconds_between(start: str | None, end: str | None) -> float | None:
+    if not start or not end:
+        return None
+    delta = datetime.fromisoformat(end.replace("Z", "+00:00")) - datetime.fromisoformat(
+        start.replace("Z", "+00:00")
+    )
+    return max(0.0, delta.total_seconds())
+
+
+def _percentiles(values: list) -> dict:
+    ordered = sorted(values)
+
+    def at(fraction: float) -> float:
+        rank = fraction * (len(ordered) - 1)
+        low = int(rank)
+        high = min(low + 1, len(ordered) - 1)
+        return round(ordered[low] + (ordered[high] - ordered[low]) * (rank - low), 1)
+
+    return {"n": len(ordered), "p50": at(0.5), "p90": at(0.9), "p95": at(0.95), "max": at(1.0)}
+
+
+def _critical_path(jobs: list, timings: dict) -> tuple[float, list]:
+    """Longest chain of queue + run time through a workflow's job dependencies."""
+    by_id = {job["id"]: job for job in jobs if job.get("id")}
+    memo: dict = {}
+
+    def visit(job_id: str) -> tuple[float, list]:
+        if job_id not in memo:
+            memo[job_id] = (0.0, [])  # Guards against dependency cycles.
+            job = by_id[job_id]
+            upstream = max(
+                (visit(dep) for dep in job.get("dependencies", []) if dep in by_id),
+                key=lambda path: path[0],
+                default=(0.0, []),
+            )
+            memo[job_id] = (upstream[0] + timings.get(job_id, 0.0), upstream[1] + [job["name"]])
+        return memo[job_id]
+
+    return max((visit(job_id) for job_id in by_id), key=lambda path: path[0], default=(0.0, []))
+
+
+def cmd_report(args: argparse.Namespace) -> None:
+    token = _token(args)
+    host = _host(args)
+    slug = args.project_slug
+    cache = ResponseCache(enabled=not args.no_cache)
+    params = {"branch": args.branch} if args.branch else {}
+    url = f"{host}/api/v2/project/{_quote_slug(slug)}/pipeline"
+    pipelines = list(iter_items(url, token, params=params, limit=args.limit))
+
+    def job_timing(job: dict) -> dict:
+        # Only v2 job details carry queued_at; finished jobs come from the cache.
+        job_url = f"{host}/api/v2/project/{_quote_slug(slug)}/job/{job['job_number']}"
+        details, _ = cache.get_or_fetch_json(
+            job_key(host, slug, job["job_number"], "v2"), lambda: _api_get(job_url, token)
+        )
+        return {
+            "duration": _seconds_between(details.get("started_at"), details.get("stopped_at")),
+            "queue": _seconds_between(details.get("queued_at"), details.get("started_at")),
+        }
+
+    concurrency = max(1, args.concurrency)
+    workflows = []
+    with ThreadPoolExecutor(max_workers=concurrency) as list_pool, ThreadPoolExecutor(
+        max_workers=concurrency
+    ) as job_pool:
+        listings = [
+            list_pool.submit(
+                _pipeline_workflows,
+                host,
+                token,
+                cache,
+                p,
+                _recently_created(p, RERUN_WINDOW_DAYS),
+            )
+            for p in pipelines
+        ]
+        for listing in listings:
+            for workflow in listing.result():
+                if workflow.get("status") not in TERMINAL_WORKFLOW_STATUSES:
+                    continue
+                timings = {
+                    job["id"]: job_pool.submit(job_timing, job)
+                    for job in workflow["jobs"]
+                    if job.get("job_number") is not None and job.get("started_at")
+                }
+                workflows.append((workflow, timings))
+
+        durations = defaultdict(list)
+        queues = defaultdict(list)
+        critical = defaultdict(list)
+        slowest_path: dict = {}
+        walls = defaultdict(list)
+        for workflow, futures in workflows:
+            name = workflow.get("name", "")
+            jobs_by_id = {job.get("id"): job for job in workflow["jobs"]}
+            weights = {}
+            for job_id, future in futures.items():
+                timing = future.result()
+                job_name = jobs_by_id[job_id].get("name", "")
+                if timing["duration"] is not None:
+                    durations[job_name].append(timing["duration"])
+                if timing["queue"] is not None:
+                    queues[job_name].append(timing["queue"])
+                weights[job_id] = (timing["duration"] or 0.0) + (timing["queue"] or 0.0)
+            length, path = _critical_path(workflow["jobs"], weights)
+            critical[name].append(length)
+            if length >= slowest_path.get(name, (-1.0, []))[0]:
+                slowest_path[name] = (length, path)
+            wall = _seconds_between(workflow.get("created_at"), workflow.get("stopped_at"))
+            if wall is not None:
+                walls[name].append(wall)
+
+    report = {
+        "pipelines": len(pipelines),
+        "branch": args.branch,
+        "jobs": {
+            name: {
+                "duration": _percentiles(durations[name]),
+                "queue": _percentiles(queues[name]) if queues[name] else None,
+            }
+            for name in durations
+        },
+        "workflows": {
+            name: {
+                "critical_path": _percentiles(critical[name]),
+                "wall": _percentiles(walls[name]) if walls[name] else None,
+                "slowest_path": slowest_path[name][1],
+            }
+            for name in critical
+        },
+    }
+    if args.jsonl:
+        for name, stats in report["jobs"].items():
+            emit("job", name=name, **stats)
+        for name, stats in report["workflows"].items():
+            emit("workflow", name=name, **stats)
+        return
+    if args.json:
+        _print_json(report)
+        return
+
+    def print_section(title: str, rows: dict, extra=None) -> None:
+        print(f"{title}\tn\tp50\tp90\tp95\tmax")
+        for name, stats in sorted(rows.items(), key=lambda item: -item[1]["p50"]):
+            line = f"  {name}\t{stats['n']}\t{stats['p50']}\t{stats['p90']}\t{stats['p95']}\t{stats['max']}"
+            if extra:
+                line += f"\t{extra(name)}"
+            print(line)
+
+    print(f"pipelines\t{len(pipelines)}\t{args.branch or ''}")
+    jobs = report["jobs"]
+    workflows_report = report["workflows"]
+    print_section("job duration (s)", {name: item["duration"] for name, item in jobs.items()})
+    print_section(
+        "job queue (s)", {name: item["queue"] for name, item in jobs.items() if item["queue"]}
+    )
+    print_section(
+        "workflow critical path (s)",
+        {name: item["critical_path"] for name, item in workflows_report.items()},
+        extra=lambda name: " > ".join(workflows_report[name]["slowest_path"]),
+    )
+    print_section(
+        "workflow wall time (s)",
+        {name: item["wall"] for name, item in workflows_report.items() if item["wall"]},
+    )
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
-        description="CircleCI API v2 status helper."
+        prog="cc_status.py",
+        description="CircleCI API v2 status helper.",
     )
     parser.add_argument(
         "--host",
@@ -155,13 +633,23 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "--token",
-        help="CircleCI token (default: CIRCLECI_CLI_TOKEN env var)",
+        help="CircleCI token (default: CIRCLECI_CLI_TOKEN env var or ~/.circleci/cli.yml)",
     )
     parser.add_argument(
         "--json",
         action="store_true",
         help="Print raw JSON payload instead of tabular text",
     )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Emit one compact JSON record per entity as soon as it is known",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the local cache of finished jobs",
+    )
     sub = parser.add_subparsers(dest="command", required=True)
 
     pipelines = sub.add_parser("pipelines", help="List pipelines for a project.")
@@ -172,10 +660,12 @@ def build_parser() -> argparse.ArgumentParser:
 
     workflows = sub.add_parser("workflows", help="List workflows for a pipeline.")
     workflows.add_argument("pipeline_id", help="Pipeline ID")
+    workflows.add_argument("--limit", type=int, help="Limit number of items")
     workflows.set_defaults(func=cmd_workflows)
 
     jobs = sub.add_parser("jobs", help="List jobs for a workflow.")
     jobs.add_argument("workflow_id", help="Workflow ID")
+    jobs.add_argument("--limit", type=int, help="Limit number of items")
     jobs.set_defaults(func=cmd_jobs)
 
     job = sub.add_parser("job", help="Show job details (optionally steps).")
@@ -188,14 +678,98 @@ def build_parser() -> argparse.ArgumentParser:
     )
     job.set_defaults(func=cmd_job)
 
+    tree = sub.add_parser(
+        "tree",
+        help="Show a pipeline's workflows, jobs and failed steps in one call.",
+    )
+    tree.add_argument("project_slug", help="Project slug, e.g. gh/org/repo")
+    tree.add_argument("--branch", help="Use the latest pipeline on this branch")
+    tree.add_argument("--pipeline-id", help="Expand this pipeline instead of the latest")
+    tree.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Max parallel requests per level (default: 8)",
+    )
+    tree.add_argument(
+        "--no-steps",
+        action="store_true",
+        help="Skip looking up failed steps of failed jobs",
+    )
+    tree.set_defaults(func=cmd_tree)
+
+    report = sub.add_parser(
+        "report",
+        help="Job duration, queue time and critical-path percentiles over recent pipelines.",
+    )
+    report.add_argument("project_slug", help="Project slug, e.g. gh/org/repo")
+    report.add_argument("--branch", help="Only report on pipelines of this branch")
+    report.add_argument(
+        "--limit",
+        type=int,
+        default=50,
+        help="Number of recent pipelines to walk (default: 50)",
+    )
+    report.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Max parallel requests per level (default: 8)",
+    )
+    report.set_defaults(func=cmd_report)
+
+    index = sub.add_parser(
+        "index",
+        help="Index failing tests of recent pipelines for the flaky query.",
+    )
+    index.add_argument("project_slug", help="Project slug, e.g. gh/org/repo")
+    index.add_argument("--branch", help="Only index pipelines on this branch")
+    index.add_argument(
+        "--limit",
+        type=int,
+        default=50,
+        help="Number of recent pipelines to walk (default: 50)",
+    )
+    index.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Max parallel requests per level (default: 8)",
+    )
+    index.add_argument(
+        "--recheck-days",
+        type=float,
+        default=RERUN_WINDOW_DAYS,
+        help=f"Re-list finished pipelines this recent for rerun workflows (default: {RERUN_WINDOW_DAYS})",
+    )
+    index.add_argument("--db", help="Index path (default: $CIRCLECI_FLAKY_DB or the cache dir)")
+    index.set_defaults(func=cmd_index)
+
+    flaky = sub.add_parser(
+        "flaky",
+        help="Show how often a test failed in the last indexed pipelines.",
+    )
+    flaky.add_argument("project_slug", help="Project slug, e.g. gh/org/repo")
+    flaky.add_argument("test", help="Test name as printed by the runner ('%%' for LIKE patterns)")
+    flaky.add_argument("--branch", help="Only count pipelines on this branch")
+    flaky.add_argument(
+        "--last",
+        type=int,
+        default=50,
+        help="Number of most recent indexed pipelines to look at (default: 50)",
+    )
+    flaky.add_argument("--db", help="Index path (default: $CIRCLECI_FLAKY_DB or the cache dir)")
+    flaky.set_defaults(func=cmd_flaky)
+
     return parser
 
 
-def main() -> None:
+def main(argv=None) -> int:
     parser = build_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     args.func(args)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -1,75 +1,135 @@
 #!/usr/bin/env python3
 """Check CircleCI pipeline/workflow/job status for a branch and show failure output."""
 
-import json
-import os
-import re
-import sys
-from pathlib import Path
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
-
-
-def load_token() -> str:
-    """Load CircleCI token from env vars or ~/.circleci/cli.yml."""
-    token = os.environ.get("CIRCLECI_CLI_TOKEN") or os.environ.get("CIRCLE_TOKEN")
-    if token:
-        return token
-
-    config_path = Path.home() / ".circleci" / "cli.yml"
-    if not config_path.exists():
-        raise RuntimeError("CircleCI CLI config not found at ~/.circleci/cli.yml")
-
-    for line in config_path.read_text().splitlines():
-        line = line.split("#", 1)[0].strip()
-        if not line:
-            continue
-        match = re.match(r"^token\s*:\s*(.+)$", line)
-        if match:
-            token = match.group(1).strip()
-            if len(token) >= 2 and token[0] in "\"'" and token[-1] == token[0]:
-                token = token[1:-1]
-            if token:
-                return token
-
-    raise RuntimeError("CircleCI token not found in ~/.circleci/cli.yml")
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cc_config import token_or_exit
+from cc_http import get_json
+from cc_jsonl import emit
+from cc_pipeline import AdaptiveInterval, normalize_sha, wait_for_pipeline
 
 
 def api_get(token: str, base: str, path: str, params=None):
-    url = f"{base}{path}"
-    if params:
-        url = f"{url}?{urlencode(params)}"
-    req = Request(url)
-    req.add_header("Circle-Token", token)
-    with urlopen(req) as resp:
-        return json.loads(resp.read().decode("utf-8"))
-
-
-def main() -> int:
-    if len(sys.argv) < 3:
-        print("Usage: cc_status_branch.py <gh/org/repo> <branch>")
-        return 2
-
-    slug = f"gh/{sys.argv[1].strip()}"
-    branch = sys.argv[2].strip()
-    base = "https://circleci.com/api/v2"
-    token = load_token()
-
-    pipelines = api_get(token, base, f"/project/{slug}/pipeline", params={"branch": branch})
-    items = pipelines.get("items", [])
-    if not items:
-        print("No pipelines found for branch")
+    return get_json(f"{base}{path}", token, params=params)
+
+
+def fetch_workflow_jobs(token: str, base: str, workflows, concurrency: int, ordered: bool = True):
+    """Yield (workflow, jobs) pairs, fetching jobs concurrently.
+
+    Pairs come in workflow order, or as each job list arrives when ``ordered``
+    is false.
+    """
+    if concurrency <= 1 or len(workflows) <= 1:
+        for wf in workflows:
+            yield wf, api_get(token, base, f"/workflow/{wf['id']}/job")
+        return
+
+    def fetch(wf):
+        return api_get(token, base, f"/workflow/{wf['id']}/job")
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(workflows))) as pool:
+        if ordered:
+            yield from zip(workflows, pool.map(fetch, workflows))
+            return
+        futures = {pool.submit(fetch, wf): wf for wf in workflows}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Show the latest CircleCI pipeline status for a branch."
+    )
+    parser.add_argument("repo", help="GitHub org/repo")
+    parser.add_argument("branch", help="Branch name")
+    parser.add_argument(
+        "--host",
+        default="https://circleci.com",
+        help="CircleCI host (default: https://circleci.com)",
+    )
+    parser.add_argument(
+        "--sha",
+        type=normalize_sha,
+        help="Show the pipeline built from this commit (full or abbreviated) instead of the latest",
+    )
+    parser.add_argument(
+        "--wait-for-pipeline",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Keep looking for the pipeline with backoff for up to SECONDS before giving up (default: 0)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Max parallel workflow job requests (default: 8, 1 = serial)",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Emit one compact JSON record per entity as soon as it is known",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    slug = f"gh/{args.repo.strip()}"
+    branch = args.branch.strip()
+    base = f"{args.host.rstrip('/')}/api/v2"
+    token = token_or_exit()
+
+    latest = wait_for_pipeline(
+        token, base, slug, branch, args.sha, args.wait_for_pipeline, AdaptiveInterval(2, 30)
+    )
+    if latest is None:
+        if args.jsonl:
+            emit("pipeline", id=None, branch=branch, sha=args.sha, status="not_found")
+        elif args.sha:
+            print(f"No pipeline found for {args.sha} on branch")
+        else:
+            print("No pipelines found for branch")
         return 1
 
-    latest = items[0]
     pipeline_id = latest["id"]
-    print(f"pipeline_id {pipeline_id} created_at {latest.get('created_at')}")
+    if args.jsonl:
+        vcs = latest.get("vcs", {})
+        emit(
+            "pipeline",
+            id=pipeline_id,
+            number=latest.get("number"),
+            state=latest.get("state"),
+            created_at=latest.get("created_at"),
+            branch=branch,
+            revision=vcs.get("revision"),
+        )
+    else:
+        print(f"pipeline_id {pipeline_id} created_at {latest.get('created_at')}")
 
     workflows = api_get(token, base, f"/pipeline/{pipeline_id}/workflow")
     workflow_items = workflows.get("items", [])
-    for wf in workflow_items:
+    if args.jsonl:
+        for wf in workflow_items:
+            emit("workflow", id=wf["id"], name=wf["name"], status=wf["status"])
+        for wf, jobs in fetch_workflow_jobs(
+            token, base, workflow_items, args.concurrency, ordered=False
+        ):
+            for job in jobs.get("items", []):
+                emit(
+                    "job",
+                    workflow_id=wf["id"],
+                    workflow=wf["name"],
+                    name=job["name"],
+                    status=job["status"],
+                    job_number=job.get("job_number"),
+                )
+        return 0
+
+    for wf, jobs in fetch_workflow_jobs(token, base, workflow_items, args.concurrency):
         print(f"workflow {wf['name']} {wf['status']}")
-        jobs = api_get(token, base, f"/workflow/{wf['id']}/job")
         for job in jobs.get("items", []):
             print(f"job {job['name']} {job['status']} {job.get('job_number')}")
 
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Incremental parsing of CircleCI step output (a JSON array of messages)."""
+
+from __future__ import annotations
+
+import codecs
+import collections
+import json
+import re
+from collections.abc import Iterable, Iterator
+
+from cc_cache import ResponseCache
+from cc_http import default_pool
+
+_WHITESPACE = " \t\r\n"
+
+
+class StreamError(Exception):
+    pass
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[object]:
+    """Yield the elements of a top-level JSON array as their bytes arrive.
+
+    Only the unparsed tail of the input is kept in memory, so peak usage is
+    bounded by the largest single element rather than the whole document.
+    """
+    parser = _ArrayParser()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        if parser.closed:
+            # Drain the source anyway so a tee (the response cache) sees its end.
+            continue
+        yield from parser.feed(text_decoder.decode(chunk))
+    yield from parser.feed(text_decoder.decode(b"", final=True), final=True)
+    if parser.started and not parser.closed:
+        raise StreamError("Step output ended before the JSON array was closed.")
+
+
+class _ArrayParser:
+    def __init__(self) -> None:
+        self.decoder = json.JSONDecoder()
+        self.pending: list[str] = []
+        self.pending_size = 0
+        self.started = False
+        self.closed = False
+        # Pending size the buffer must reach before retrying a failed decode, so
+        # a large element split over many chunks is not re-joined and re-parsed
+        # once per chunk.
+        self.retry_at = 0
+
+    def feed(self, data: str, final: bool = False) -> Iterator[object]:
+        self.pending.append(data)
+        self.pending_size += len(data)
+        if self.pending_size < self.retry_at and not final:
+            return
+        buf = "".join(self.pending)
+        pos = 0
+        self.retry_at = 0
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not self.started:
+                if buf[pos] != "[":
+                    raise StreamError("Step output is not a JSON array.")
+                self.started = True
+                pos += 1
+            elif buf[pos] == ",":
+                pos += 1
+            elif buf[pos] == "]":
+                self.closed = True
+                pos += 1
+                break
+            else:
+                try:
+                    item, pos = self.decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError as exc:
+                    if final:
+                        raise StreamError(f"Invalid step output: {exc}") from exc
+                    self.retry_at = 2 * (len(buf) - pos)
+                    break
+                yield item
+        rest = buf[pos:]
+        self.pending = [rest]
+        self.pending_size = len(rest)
+
+
+def iter_step_messages(
+    output_url: str, cache: ResponseCache | None = None, cache_key: str | None = None
+) -> Iterator[str]:
+    """Stream ``message`` strings from a presigned output_url.
+
+    When a cache and key are given, the raw output is served from (or written
+    to) the cache instead; presigned URLs change on every request, so the key
+    must identify the job action rather than the URL.
+    """
+
+    def fetch():
+        return default_pool().iter_content(output_url)
+
+    chunks = cache.iter_chunks(cache_key, fetch) if cache and cache_key else fetch()
+    for item in iter_json_array(chunks):
+        if isinstance(item, dict):
+            message = item.get("message")
+            if message:
+                yield message
+
+
+def filter_lines(
+    messages: Iterable[str], pattern: str | None = None, tail: int | None = None
+) -> Iterator[str]:
+    """Split messages into lines, keep lines matching ``pattern``, then the last ``tail``."""
+    regex = re.compile(pattern) if pattern else None
+    lines = (
+        line
+        for message in messages
+        for line in message.splitlines()
+        if regex is None or regex.search(line)
+    )
+    if tail is None:
+        yield from lines
+        return
+    yield from collections.deque(lines, maxlen=tail)
@@ -1,86 +1,278 @@
 #!/usr/bin/env python3
 """Poll CircleCI pipeline/workflow/job status until completion."""
 
-import json
-import os
-import re
+from __future__ import annotations
+
+import argparse
 import sys
 import time
-from pathlib import Path
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 
+from cc_config import token_or_exit
+from cc_http import (
+    NETWORK_ERRORS,
+    ConditionalFetcher,
+    HTTPError,
+    get_json,
+    is_transient,
+    post_json,
+)
+from cc_jsonl import emit
+from cc_pipeline import (
+    ACTIVE_JOB_STATUSES,
+    FAILED_JOB_STATUSES,
+    FAILED_WORKFLOW_STATUSES,
+    TERMINAL_WORKFLOW_STATUSES,
+    AdaptiveInterval,
+    normalize_sha,
+    wait_for_pipeline,
+)
 
-def load_token() -> str:
-    """Load CircleCI token from env vars or ~/.circleci/cli.yml."""
-    token = os.environ.get("CIRCLECI_CLI_TOKEN") or os.environ.get("CIRCLE_TOKEN")
-    if token:
-        return token
 
-    config_path = Path.home() / ".circleci" / "cli.yml"
-    if not config_path.exists():
-        raise RuntimeError("CircleCI CLI config not found at ~/.circleci/cli.yml")
+def api_get(token: str, base: str, path: str, params=None):
+    return get_json(f"{base}{path}", token, params=params)
 
-    for line in config_path.read_text().splitlines():
-        line = line.split("#", 1)[0].strip()
-        if not line:
-            continue
-        match = re.match(r"^token\s*:\s*(.+)$", line)
-        if match:
-            token = match.group(1).strip()
-            if len(token) >= 2 and token[0] in "\"'" and token[-1] == token[0]:
-                token = token[1:-1]
-            if token:
-                return token
 
-    raise RuntimeError("CircleCI token not found in ~/.circleci/cli.yml")
+def latest_workflows(workflow_items) -> list:
+    """Drop workflows that were rerun: keep the newest workflow of each name."""
+    latest: dict[str, dict] = {}
+    for wf in workflow_items:
+        current = latest.get(wf["name"])
+        if current is None or (wf.get("created_at") or "") >= (current.get("created_at") or ""):
+            latest[wf["name"]] = wf
+    return [wf for wf in workflow_items if latest[wf["name"]] is wf]
 
 
-def api_get(token: str, base: str, path: str, params=None):
-    url = f"{base}{path}"
-    if params:
-        url = f"{url}?{urlencode(params)}"
-    req = Request(url)
-    req.add_header("Circle-Token", token)
-    with urlopen(req) as resp:
-        return json.loads(resp.read().decode("utf-8"))
-
-
-def main() -> int:
-    if len(sys.argv) < 3:
-        print("Usage: cc_wait_branch.py <gh/org/repo> <branch> [interval_seconds]")
-        return 2
-
-    slug = f"gh/{sys.argv[1].strip()}"
-    branch = sys.argv[2].strip()
-    interval = int(sys.argv[3]) if len(sys.argv) > 3 else 30
-
-    base = "https://circleci.com/api/v2"
-    token = load_token()
-
-    pipelines = api_get(token, base, f"/project/{slug}/pipeline", params={"branch": branch})
-    items = pipelines.get("items", [])
-    if not items:
-        print("No pipelines found for branch")
+def rerun_failed_workflows(token: str, base: str, workflow_items) -> dict[str, str]:
+    """Rerun every failed workflow from its failed jobs; map old to new workflow IDs.
+
+    Only finished workflows can be rerun, so ``failing`` ones are left alone.
+    """
+    reruns = {}
+    for wf in workflow_items:
+        if wf["status"] in FAILED_WORKFLOW_STATUSES & TERMINAL_WORKFLOW_STATUSES:
+            result = post_json(f"{base}/workflow/{wf['id']}/rerun", token, {"from_failed": True})
+            reruns[wf["id"]] = result["workflow_id"]
+    return reruns
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Poll CircleCI pipeline/workflow/job status for a branch until completion."
+    )
+    parser.add_argument("repo", help="GitHub org/repo")
+    parser.add_argument("branch", help="Branch name")
+    parser.add_argument(
+        "interval",
+        nargs="?",
+        type=float,
+        default=30,
+        help="Maximum seconds between polls (default: 30)",
+    )
+    parser.add_argument(
+        "--sha",
+        type=normalize_sha,
+        help="Wait for the pipeline built from this commit (full or abbreviated) instead of the latest",
+    )
+    parser.add_argument(
+        "--wait-for-pipeline",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Keep looking for the pipeline with backoff for up to SECONDS before giving up (default: 0)",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=5,
+        help="Seconds between polls right after a status change (default: 5)",
+    )
+    parser.add_argument(
+        "--events",
+        action="store_true",
+        help="Only print state changes (job X: running -> failed) instead of snapshots",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Emit one compact JSON record per state change (implies --events)",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Exit with status 1 as soon as any job or workflow fails",
+    )
+    parser.add_argument(
+        "--rerun-failed",
+        action="store_true",
+        help="When the pipeline finishes with failed workflows, rerun them from failed and keep waiting",
+    )
+    parser.add_argument(
+        "--max-reruns",
+        type=int,
+        default=1,
+        help="How many rounds of reruns --rerun-failed may trigger (default: 1)",
+    )
+    parser.add_argument(
+        "--host",
+        default="https://circleci.com",
+        help="CircleCI host (default: https://circleci.com)",
+    )
+    return parser.parse_args(argv)
+
+
+def print_events(workflow_items, jobs_by_workflow, last_seen: dict, jsonl: bool = False) -> None:
+    for wf in workflow_items:
+        key = ("workflow", wf["id"])
+        previous = last_seen.get(key)
+        if previous != wf["status"]:
+            if jsonl:
+                emit("workflow", id=wf["id"], name=wf["name"], **{"from": previous, "to": wf["status"]})
+            else:
+                transition = f"{previous} -> {wf['status']}" if previous else wf["status"]
+                print(f"workflow {wf['name']}: {transition}", flush=True)
+            last_seen[key] = wf["status"]
+        for job in jobs_by_workflow.get(wf["id"], []):
+            key = ("job", wf["id"], job.get("id") or job["name"])
+            previous = last_seen.get(key)
+            if previous != job["status"]:
+                if jsonl:
+                    emit(
+                        "job",
+                        workflow=wf["name"],
+                        name=job["name"],
+                        job_number=job.get("job_number"),
+                        **{"from": previous, "to": job["status"]},
+                    )
+                else:
+                    transition = f"{previous} -> {job['status']}" if previous else job["status"]
+                    print(f"job {job['name']}: {transition} {job.get('job_number')}", flush=True)
+                last_seen[key] = job["status"]
+
+
+def print_snapshot(workflow_items, jobs_by_workflow) -> None:
+    print("status-check")
+    for wf in workflow_items:
+        print(f"workflow {wf['name']} {wf['status']}")
+        for job in jobs_by_workflow.get(wf["id"], []):
+            print(f"job {job['name']} {job['status']} {job.get('job_number')}")
+    sys.stdout.flush()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    slug = f"gh/{args.repo.strip()}"
+    branch = args.branch.strip()
+
+    base = f"{args.host.rstrip('/')}/api/v2"
+    token = token_or_exit()
+
+    pipeline = wait_for_pipeline(
+        token,
+        base,
+        slug,
+        branch,
+        args.sha,
+        args.wait_for_pipeline,
+        AdaptiveInterval(args.min_interval, args.interval),
+    )
+    if pipeline is None:
+        if args.jsonl:
+            emit("pipeline", id=None, branch=branch, sha=args.sha, status="not_found")
+        elif args.sha:
+            print(f"No pipeline found for {args.sha} on branch")
+        else:
+            print("No pipelines found for branch")
         return 1
 
-    pipeline_id = items[0]["id"]
+    pipeline_id = pipeline["id"]
+    if args.jsonl:
+        emit(
+            "pipeline",
+            id=pipeline_id,
+            branch=branch,
+            revision=pipeline.get("vcs", {}).get("revision"),
+            created_at=pipeline.get("created_at"),
+        )
+    fetcher = ConditionalFetcher(token)
+    schedule = AdaptiveInterval(args.min_interval, args.interval)
+    # Job lists of workflows that finished are final; they are fetched once more
+    # after the workflow reaches a terminal status and then never polled again.
+    jobs_by_workflow: dict[str, list] = {}
+    finished_workflows: set[str] = set()
+    last_seen: dict = {}
+    # Reruns appear as new workflows of the same pipeline; the failed originals
+    # are dropped from the view and the loop waits for their replacements.
+    superseded: set[str] = set()
+    pending_reruns: set[str] = set()
+    reruns_left = args.max_reruns if args.rerun_failed else 0
     while True:
-        workflows = api_get(token, base, f"/pipeline/{pipeline_id}/workflow")
-        workflow_items = workflows.get("items", [])
-        done = True
-        print("status-check")
+        try:
+            workflows, changed = fetcher.get(f"{base}/pipeline/{pipeline_id}/workflow")
+            workflow_items = latest_workflows(
+                [wf for wf in workflows.get("items", []) if wf["id"] not in superseded]
+            )
+            pending_reruns -= {wf["id"] for wf in workflow_items}
+            for wf in workflow_items:
+                wf_id = wf["id"]
+                if wf_id in finished_workflows:
+                    continue
+                jobs_url = f"{base}/workflow/{wf_id}/job"
+                jobs, jobs_changed = fetcher.get(jobs_url)
+                jobs_by_workflow[wf_id] = jobs.get("items", [])
+                changed = changed or jobs_changed
+                if wf["status"] in TERMINAL_WORKFLOW_STATUSES:
+                    finished_workflows.add(wf_id)
+                    fetcher.forget(jobs_url)
+        except (HTTPError, *NETWORK_ERRORS) as exc:
+            # The HTTP layer already retried; keep waiting through longer outages.
+            if not is_transient(exc):
+                raise
+            delay = exc.retry_after if isinstance(exc, HTTPError) else None
+            if delay is None:
+                delay = schedule.next(False)
+            print(f"API unavailable ({exc}), retrying in {delay:.0f}s", file=sys.stderr)
+            time.sleep(delay)
+            continue
+
+        if changed:
+            if args.events or args.jsonl:
+                print_events(workflow_items, jobs_by_workflow, last_seen, args.jsonl)
+            else:
+                print_snapshot(workflow_items, jobs_by_workflow)
+
+        done = not pending_reruns
+        failed = False
         for wf in workflow_items:
-            print(f"workflow {wf['name']} {wf['status']}")
-            jobs = api_get(token, base, f"/workflow/{wf['id']}/job")
-            for job in jobs.get("items", []):
-                status = job["status"]
-                print(f"job {job['name']} {status} {job.get('job_number')}")
-                if status in {"running", "queued", "blocked", "on_hold", "not_running"}:
+            if wf["status"] in FAILED_WORKFLOW_STATUSES:
+                failed = True
+            if reruns_left and wf["status"] not in TERMINAL_WORKFLOW_STATUSES:
+                # Wait for the workflow itself to finish before it can be rerun.
+                done = False
+            for job in jobs_by_workflow.get(wf["id"], []):
+                if job["status"] in ACTIVE_JOB_STATUSES:
                     done = False
+                elif job["status"] in FAILED_JOB_STATUSES:
+                    failed = True
+        if args.fail_fast and failed and not reruns_left:
+            return 1
+        if done and failed and reruns_left:
+            reruns = rerun_failed_workflows(token, base, workflow_items)
+            if reruns:
+                reruns_left -= 1
+                superseded.update(reruns)
+                pending_reruns.update(reruns.values())
+                for wf in workflow_items:
+                    if wf["id"] in reruns:
+                        if args.jsonl:
+                            emit("rerun", workflow=wf["name"], id=wf["id"], new_id=reruns[wf["id"]])
+                        else:
+                            print(f"rerun workflow {wf['name']}: {wf['id']} -> {reruns[wf['id']]}", flush=True)
+                time.sleep(schedule.next(True))
+                continue
         if done:
             break
-        time.sleep(interval)
+        time.sleep(schedule.next(changed))
 
     return 0
 
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Watch many CircleCI project/branch pairs from one process and print state changes."""
+
+import argparse
+import asyncio
+import sys
+import time
+from urllib.parse import urlencode
+
+from cc_config import token_or_exit
+from cc_http import NETWORK_ERRORS, ConditionalFetcher, HTTPError, is_transient
+from cc_jsonl import emit
+from cc_pipeline import ACTIVE_JOB_STATUSES, TERMINAL_WORKFLOW_STATUSES, AdaptiveInterval
+
+
+class RateLimiter:
+    """Token bucket shared by every watch task (requests per second)."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Watcher:
+    def __init__(self, args: argparse.Namespace, token: str) -> None:
+        self.args = args
+        self.base = f"{args.host.rstrip('/')}/api/v2"
+        self.fetcher = ConditionalFetcher(token)
+        self.limiter = RateLimiter(args.rate, args.concurrency)
+        self.slots = asyncio.Semaphore(args.concurrency)
+
+    async def get(self, url: str):
+        """Conditional GET on the shared pool, honoring the global rate limit."""
+        while True:
+            async with self.slots:
+                await self.limiter.acquire()
+                try:
+                    return await asyncio.to_thread(self.fetcher.get, url)
+                except (HTTPError, *NETWORK_ERRORS) as exc:
+                    if not is_transient(exc):
+                        raise
+                    delay = (exc.retry_after if isinstance(exc, HTTPError) else None) or 10.0
+            # Back off every task, not just this one: the limit is per token.
+            self.limiter.pause(delay)
+
+    def emit(self, target: dict, kind: str, name: str, previous, current, **extra) -> None:
+        if self.args.jsonl:
+            emit(
+                kind,
+                time=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                project=target["slug"],
+                branch=target["branch"],
+                name=name,
+                **{"from": previous, "to": current},
+                **extra,
+            )
+            return
+        transition = f"{previous} -> {current}" if previous else current
+        suffix = "".join(f" {value}" for value in extra.values() if value is not None)
+        print(
+            f"{target['slug']} {target['branch']} {kind} {name}: {transition}{suffix}",
+            flush=True,
+        )
+
+    async def watch(self, target: dict) -> None:
+        schedule = AdaptiveInterval(self.args.min_interval, self.args.interval)
+        pipelines_url = (
+            f"{self.base}/project/{target['slug']}/pipeline?"
+            f"{urlencode({'branch': target['branch']})}"
+        )
+        pipeline_id = None
+        last_seen: dict = {}
+        finished: set[str] = set()
+        jobs_by_workflow: dict[str, list] = {}
+        while True:
+            pipelines, changed = await self.get(pipelines_url)
+            items = pipelines.get("items", [])
+            if not items:
+                if pipeline_id is None and not self.args.follow:
+                    self.emit(target, "pipeline", "-", None, "not_found")
+                    return
+            elif items[0]["id"] != pipeline_id:
+                pipeline_id = items[0]["id"]
+                self.emit(target, "pipeline", pipeline_id, None, items[0].get("state") or "created")
+                last_seen.clear()
+                finished.clear()
+                jobs_by_workflow.clear()
+
+            done = pipeline_id is not None
+            if pipeline_id is not None:
+                workflows, wf_changed = await self.get(f"{self.base}/pipeline/{pipeline_id}/workflow")
+                changed = changed or wf_changed
+                workflow_items = workflows.get("items", [])
+                pending = [wf for wf in workflow_items if wf["id"] not in finished]
+                results = await asyncio.gather(
+                    *(self.get(f"{self.base}/workflow/{wf['id']}/job") for wf in pending)
+                )
+                for wf, (jobs, jobs_changed) in zip(pending, results):
+                    jobs_by_workflow[wf["id"]] = jobs.get("items", [])
+                    changed = changed or jobs_changed
+                    if wf["status"] in TERMINAL_WORKFLOW_STATUSES:
+                        finished.add(wf["id"])
+
+                for wf in workflow_items:
+                    if last_seen.get(wf["id"]) != wf["status"]:
+                        self.emit(target, "workflow", wf["name"], last_seen.get(wf["id"]), wf["status"])
+                        last_seen[wf["id"]] = wf["status"]
+                    for job in jobs_by_workflow.get(wf["id"], []):
+                        key = (wf["id"], job.get("id") or job["name"])
+                        if last_seen.get(key) != job["status"]:
+                            self.emit(
+                                target,
+                                "job",
+                                job["name"],
+                                last_seen.get(key),
+                                job["status"],
+                                job_number=job.get("job_number"),
+                            )
+                            last_seen[key] = job["status"]
+                        if job["status"] in ACTIVE_JOB_STATUSES:
+                            done = False
+                    if wf["status"] not in TERMINAL_WORKFLOW_STATUSES:
+                        done = False
+
+            if done and not self.args.follow:
+                return
+            await asyncio.sleep(schedule.next(changed))
+
+
+def parse_target(spec: str) -> dict:
+    repo, sep, branch = spec.strip().partition(":")
+    if not sep or not repo or not branch:
+        raise SystemExit(f"Invalid target {spec!r}; expected org/repo:branch")
+    slug = repo if repo.count("/") == 2 else f"gh/{repo}"
+    return {"slug": slug, "branch": branch}
+
+
+def load_targets(args: argparse.Namespace) -> list[dict]:
+    specs = list(args.targets)
+    if args.file:
+        handle = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with handle:
+            for raw in handle:
+                line = raw.split("#", 1)[0].strip()
+                if line:
+                    # Accept both "org/repo:branch" and "org/repo branch".
+                    specs.append(":".join(line.split(None, 1)) if ":" not in line else line)
+    if not specs:
+        raise SystemExit("No targets given; pass org/repo:branch or --file.")
+    return [parse_target(spec) for spec in dict.fromkeys(specs)]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Watch CircleCI pipelines for many project/branch pairs at once."
+    )
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        help="Targets as org/repo:branch (or gh/org/repo:branch)",
+    )
+    parser.add_argument("--file", help="File with one target per line ('-' for stdin)")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=60,
+        help="Maximum seconds between polls of one target (default: 60)",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=10,
+        help="Seconds between polls of a target right after it changed (default: 10)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=5,
+        help="Global request rate limit in requests per second (default: 5)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Max requests in flight across all targets (default: 8)",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep watching for new pipelines instead of exiting when all finish",
+    )
+    parser.add_argument("--jsonl", action="store_true", help="Emit one JSON object per change")
+    parser.add_argument(
+        "--host",
+        default="https://circleci.com",
+        help="CircleCI host (default: https://circleci.com)",
+    )
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> int:
+    targets = load_targets(args)
+    watcher = Watcher(args, token_or_exit())
+    results = await asyncio.gather(
+        *(watcher.watch(target) for target in targets), return_exceptions=True
+    )
+    status = 0
+    for target, result in zip(targets, results):
+        if isinstance(result, Exception):
+            print(f"{target['slug']} {target['branch']} error: {result}", file=sys.stderr)
+            status = 1
+    return status
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())